@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# GDBus - GLib D-Bus Library
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General
+# Public License along with this library; if not, see <http://www.gnu.org/licenses/>.
+
+"""Measures the startup cost of gdbus-codegen.
+
+Runs the bin/gdbus-codegen launcher of each PREFIX once per output mode
+and repetition, under "python -X importtime", and reports the median
+and minimum of the wall time and of the time spent importing modules.
+The prefixes are run interleaved, so that a "before" and an "after"
+tree can be compared on a machine that is not otherwise idle:
+
+    codegen-startup-bench.py /tmp/before/usr /usr
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE_XML = """<node>
+  <interface name="org.example.Bench">
+    <method name="Ping">
+      <arg name="value" direction="in" type="s"/>
+      <arg name="reply" direction="out" type="s"/>
+    </method>
+    <signal name="Changed">
+      <arg name="serial" type="u"/>
+    </signal>
+    <property name="Name" type="s" access="readwrite"/>
+  </interface>
+</node>
+"""
+
+MODES = {
+    "generate-md": ["--generate-md", "md", "--output-directory", "{out}"],
+    "generate-rst": ["--generate-rst", "rst", "--output-directory", "{out}"],
+    "interface-info-header": [
+        "--interface-info-header",
+        "--output",
+        "{out}/info.h",
+    ],
+    "interface-info-body": ["--interface-info-body", "--output", "{out}/info.c"],
+    "header": ["--header", "--output", "{out}/gen.h"],
+    "generate-c-code": ["--generate-c-code", "{out}/gen"],
+}
+
+
+def import_time_us(stderr):
+    # Only the top-level entries are summed: the cumulative time of each
+    # one already includes the modules it imports. Modules that are
+    # imported lazily show up as top-level entries of their own.
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        if name.startswith(" ") and not name.startswith("  "):
+            total += int(fields[1])
+    return total
+
+
+def run_once(python, launcher, args, env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [python, "-X", "importtime", launcher] + args,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        sys.exit("{} failed with exit status {}".format(launcher, proc.returncode))
+    return wall * 1000, import_time_us(proc.stderr) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the startup time of gdbus-codegen."
+    )
+    parser.add_argument(
+        "prefixes",
+        metavar="PREFIX",
+        nargs="*",
+        help="Prefix containing bin/gdbus-codegen "
+        "(default: the prefix this script is installed in)",
+    )
+    parser.add_argument(
+        "--xml",
+        metavar="FILE",
+        help="D-Bus introspection XML to generate from "
+        "(default: a small built-in interface)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=sorted(MODES),
+        action="append",
+        help="Output mode to measure (default: all of them)",
+    )
+    parser.add_argument(
+        "--reps", type=int, default=15, help="Runs per prefix and mode (default: 15)"
+    )
+    parser.add_argument(
+        "--no-bytecode",
+        action="store_true",
+        help="Compile the modules from source on every run",
+    )
+    parser.add_argument(
+        "--python",
+        default=sys.executable,
+        help="Interpreter to run the launcher with (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    prefixes = args.prefixes
+    if not prefixes:
+        here = os.path.dirname(os.path.abspath(__file__))
+        prefixes = [os.path.join(here, "..", "..")]
+    launchers = []
+    for prefix in prefixes:
+        launcher = os.path.join(prefix, "bin", "gdbus-codegen")
+        if not os.path.isfile(launcher):
+            parser.error("{} does not exist".format(launcher))
+        launchers.append(launcher)
+
+    tmpdir = tempfile.TemporaryDirectory()
+    xml = args.xml
+    if xml is None:
+        xml = os.path.join(tmpdir.name, "org.example.Bench.xml")
+        with open(xml, "w") as f:
+            f.write(SAMPLE_XML)
+    out = os.path.join(tmpdir.name, "out")
+    os.mkdir(out)
+
+    # Every prefix gets its own bytecode cache, so that the trees do not
+    # share .pyc files and no run writes into the prefixes themselves.
+    envs = []
+    for n in range(len(launchers)):
+        env = dict(os.environ)
+        if args.no_bytecode:
+            env["PYTHONDONTWRITEBYTECODE"] = "1"
+        else:
+            env.pop("PYTHONDONTWRITEBYTECODE", None)
+            env["PYTHONPYCACHEPREFIX"] = os.path.join(tmpdir.name, "pyc{}".format(n))
+        envs.append(env)
+
+    modes = args.mode or list(MODES)
+    results = {}
+    for mode in modes:
+        mode_args = [a.format(out=out) for a in MODES[mode]] + [xml]
+        # One warm-up run fills the bytecode cache and the page cache.
+        for launcher, env in zip(launchers, envs):
+            run_once(args.python, launcher, mode_args, env)
+        for _ in range(args.reps):
+            for launcher, env in zip(launchers, envs):
+                sample = run_once(args.python, launcher, mode_args, env)
+                results.setdefault((mode, launcher), []).append(sample)
+
+    print("median / min in ms, {} runs each".format(args.reps))
+    for n, prefix in enumerate(prefixes):
+        print("  [{}] {}".format(n, os.path.normpath(prefix)))
+    print()
+    print("{:24} {:>3} {:>17} {:>17}".format("mode", "", "wall", "imports"))
+    for mode in modes:
+        for n, launcher in enumerate(launchers):
+            walls, imports = zip(*results[(mode, launcher)])
+            print(
+                "{:24} [{}] {:8.1f} /{:6.1f} {:8.1f} /{:6.1f}".format(
+                    mode if n == 0 else "",
+                    n,
+                    statistics.median(walls),
+                    min(walls),
+                    statistics.median(imports),
+                    min(imports),
+                )
+            )
+
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# -*- Mode: Python -*-
+
+# GDBus - GLib D-Bus Library
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+import functools
+import gc
+import hashlib
+import json
+import os
+import pickle
+
+from . import config
+from . import utils
+
+
+def hash_file(filename):
+    """Returns the SHA-256 hex digest of the contents of a file"""
+    with open(filename, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def generator_revision():
+    """Returns a digest of the gdbus-codegen sources.
+
+    The output of the generator can change without config.VERSION changing,
+    so the cache keys include this as well.
+    """
+    digest = hashlib.sha256()
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(source_dir)):
+        if name.endswith(".py"):
+            digest.update(name.encode("utf-8"))
+            digest.update(hash_file(os.path.join(source_dir, name)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _entry_name(group, key, suffix):
+    return "{}-{}{}".format(group, key, suffix)
+
+
+def _prune_group(cache_dir, group, keep, suffix):
+    """Removes the entries of a group other than keep, which are stale as
+    they are for the same purpose as it"""
+    prefix = group + "-"
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name.endswith(suffix) and name != keep:
+            try:
+                os.unlink(os.path.join(cache_dir, name))
+            except OSError:
+                # Another run may have removed it already
+                pass
+
+
+class BuildCache:
+    """Persistent record of the outputs produced for a set of inputs.
+
+    Entries are keyed by the gdbus-codegen version and sources, the command
+    line options and the contents of every input file. An entry lists the
+    generated files together with a hash of their contents, so a later run
+    with the same key can tell whether the outputs on disk are still the ones
+    it would produce.
+
+    Entries are grouped by the outputs they are for, and recording an entry
+    removes the others of its group, which describe older versions of the
+    same files.
+    """
+
+    def __init__(self, cache_dir, input_files, options, outputs):
+        self.cache_dir = cache_dir
+
+        group = hashlib.sha256()
+        group.update(os.getcwd().encode("utf-8"))
+        group.update(json.dumps(sorted(outputs)).encode("utf-8"))
+        self.group = group.hexdigest()
+
+        key = hashlib.sha256()
+        key.update(config.VERSION.encode("utf-8"))
+        key.update(generator_revision().encode("utf-8"))
+        key.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        for fname in input_files:
+            key.update(hash_file(fname).encode("utf-8"))
+        self.key = key.hexdigest()
+        self.name = _entry_name(self.group, self.key, ".json")
+        self.path = os.path.join(cache_dir, self.name)
+
+    def is_up_to_date(self):
+        try:
+            with open(self.path, "r") as f:
+                outputs = json.load(f)["outputs"]
+        except (OSError, ValueError, KeyError):
+            return False
+
+        for fname, digest in outputs.items():
+            try:
+                if hash_file(fname) != digest:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def record(self, output_files):
+        outputs = {fname: hash_file(fname) for fname in output_files}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        utils.write_file_atomically(
+            self.path, json.dumps({"version": config.VERSION, "outputs": outputs})
+        )
+        _prune_group(self.cache_dir, self.group, self.name, ".json")
+
+
+class InterfaceCache:
+    """Persistent store of the interfaces parsed from XML files.
+
+    Each entry holds the post-processed interfaces of one XML file, pickled.
+    Entries are keyed by the gdbus-codegen version and sources, the options
+    that affect parsing and post-processing and the contents of the file, so
+    they can be shared by any invocation that uses the same file with the
+    same options. As entries are unpickled, the cache directory must not be
+    writable by untrusted users.
+
+    Entries are grouped by file and options, and storing an entry removes
+    the others of its group, which hold older versions of the file.
+    """
+
+    def __init__(self, cache_dir, options):
+        self.cache_dir = cache_dir
+        self.options = json.dumps(options, sort_keys=True)
+        self._names = {}
+
+    def _name(self, filename):
+        name = self._names.get(filename)
+        if name is None:
+            group = hashlib.sha256()
+            group.update(self.options.encode("utf-8"))
+            group.update(os.path.abspath(filename).encode("utf-8"))
+            key = hashlib.sha256()
+            key.update(config.VERSION.encode("utf-8"))
+            key.update(generator_revision().encode("utf-8"))
+            key.update(self.options.encode("utf-8"))
+            key.update(hash_file(filename).encode("utf-8"))
+            name = (group.hexdigest(), key.hexdigest())
+            self._names[filename] = name
+        return name
+
+    def _path(self, filename):
+        return os.path.join(
+            self.cache_dir, _entry_name(*self._name(filename), ".ifaces")
+        )
+
+    def load(self, filename):
+        """Returns the cached interfaces of a file, or None"""
+        # Unpickling creates many objects in one go, and the cyclic garbage
+        # collector would keep scanning them for nothing
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self._path(filename), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            # A missing, truncated or otherwise unusable entry is a cache miss
+            return None
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def store(self, filename, ifaces):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        utils.write_file_atomically(
+            self._path(filename), pickle.dumps(ifaces, pickle.HIGHEST_PROTOCOL)
+        )
+        group, key = self._name(filename)
+        _prune_group(
+            self.cache_dir, group, _entry_name(group, key, ".ifaces"), ".ifaces"
+        )
@@ -21,6 +21,9 @@
 #
 # Author: David Zeuthen <davidz@redhat.com>
 
+import copy
+import io
+
 from . import config
 from . import utils
 from . import dbustypes
@@ -56,6 +59,22 @@ def generate_namespace(namespace):
     return (ns, ns_upper, ns_lower)
 
 
+# Generator used by the worker processes of CodeGenerator.generate(), set once
+# per worker so the interfaces are not sent along with every task
+_worker_generator = None
+
+
+def _init_worker_generator(generator):
+    global _worker_generator
+    _worker_generator = generator
+
+
+def _generate_interface_section_in_worker(index):
+    _worker_generator.outfile = io.StringIO()
+    _worker_generator.generate_interface_section(_worker_generator.ifaces[index])
+    return _worker_generator.outfile.getvalue()
+
+
 def generate_header_guard(header_name):
     if header_name == "-":
         return "STDOUT"
@@ -82,11 +101,15 @@ class HeaderCodeGenerator:
         symbol_decorator,
         symbol_decorator_header,
         outfile,
+        proxy_property_batch=False,
+        method_stats=False,
     ):
         self.ifaces = ifaces
         self.namespace, self.ns_upper, self.ns_lower = generate_namespace(namespace)
         self.generate_objmanager = generate_objmanager
         self.generate_autocleanup = generate_autocleanup
+        self.proxy_property_batch = proxy_property_batch
+        self.method_stats = method_stats
         self.header_guard = generate_header_guard(header_name)
         self.input_files_basenames = input_files_basenames
         self.use_pragma = use_pragma
@@ -540,6 +563,36 @@ class HeaderCodeGenerator:
                 "    GError             **error);\n" % (i.camel_name, i.name_lower)
             )
             self.outfile.write("\n")
+            if self.proxy_property_batch and len(i.properties) > 0:
+                for func_name, params in (
+                    ("set_properties", "    GVariant            *properties,\n"),
+                    ("refresh_all", ""),
+                ):
+                    if self.symbol_decorator is not None:
+                        self.outfile.write("%s\n" % self.symbol_decorator)
+                    if i.deprecated:
+                        self.outfile.write("G_GNUC_DEPRECATED ")
+                    self.outfile.write(
+                        "void %s_proxy_%s (\n"
+                        "    %sProxy *proxy,\n"
+                        "%s"
+                        "    GCancellable        *cancellable,\n"
+                        "    GAsyncReadyCallback  callback,\n"
+                        "    gpointer             user_data);\n"
+                        % (i.name_lower, func_name, i.camel_name, params)
+                    )
+                    if self.symbol_decorator is not None:
+                        self.outfile.write("%s\n" % self.symbol_decorator)
+                    if i.deprecated:
+                        self.outfile.write("G_GNUC_DEPRECATED ")
+                    self.outfile.write(
+                        "gboolean %s_proxy_%s_finish (\n"
+                        "    %sProxy *proxy,\n"
+                        "    GAsyncResult        *res,\n"
+                        "    GError             **error);\n"
+                        % (i.name_lower, func_name, i.camel_name)
+                    )
+                self.outfile.write("\n")
 
             # Then the skeleton
             self.outfile.write("\n")
@@ -616,6 +669,32 @@ class HeaderCodeGenerator:
             self.outfile.write(
                 "%s *%s_skeleton_new (void);\n" % (i.camel_name, i.name_lower)
             )
+            if self.method_stats and len(i.methods) > 0:
+                self.outfile.write("\n")
+                if self.symbol_decorator is not None:
+                    self.outfile.write("%s\n" % self.symbol_decorator)
+                if i.deprecated:
+                    self.outfile.write("G_GNUC_DEPRECATED ")
+                self.outfile.write(
+                    "gboolean %s_skeleton_get_method_stats (\n"
+                    "    %sSkeleton *skeleton,\n"
+                    "    const gchar *method_name,\n"
+                    "    guint *out_num_calls,\n"
+                    "    guint *out_num_unhandled,\n"
+                    "    guint *out_num_completed,\n"
+                    "    guint64 *out_handle_time,\n"
+                    "    guint64 *out_complete_time,\n"
+                    "    guint64 *out_max_complete_time);\n"
+                    % (i.name_lower, i.camel_name)
+                )
+                if self.symbol_decorator is not None:
+                    self.outfile.write("%s\n" % self.symbol_decorator)
+                if i.deprecated:
+                    self.outfile.write("G_GNUC_DEPRECATED ")
+                self.outfile.write(
+                    "void %s_skeleton_reset_method_stats (%sSkeleton *skeleton);\n"
+                    % (i.name_lower, i.camel_name)
+                )
 
             self.outfile.write("\n")
 
@@ -1453,6 +1532,13 @@ class CodeGenerator:
         glib_min_required,
         symbol_decoration_define,
         outfile,
+        jobs=1,
+        fast_dispatch=False,
+        method_handlers=False,
+        changed_property_array=False,
+        proxy_property_cache=False,
+        proxy_property_batch=False,
+        method_stats=False,
     ):
         self.ifaces = ifaces
         self.namespace, self.ns_upper, self.ns_lower = generate_namespace(namespace)
@@ -1463,6 +1549,13 @@ class CodeGenerator:
         self.glib_min_required = glib_min_required
         self.symbol_decoration_define = symbol_decoration_define
         self.outfile = outfile
+        self.jobs = jobs
+        self.fast_dispatch = fast_dispatch
+        self.method_handlers = method_handlers
+        self.changed_property_array = changed_property_array
+        self.proxy_property_cache = proxy_property_cache
+        self.proxy_property_batch = proxy_property_batch
+        self.method_stats = method_stats
         self.marshallers = set()
 
     # ----------------------------------------------------------------------------------------------------
@@ -1586,22 +1679,23 @@ class CodeGenerator:
             "\n"
         )
 
-        self.outfile.write(
-            "typedef struct\n"
-            "{\n"
-            "  const _ExtendedGDBusPropertyInfo *info;\n"
-            "  guint prop_id;\n"
-            "  GValue orig_value; /* the value before the change */\n"
-            "} ChangedProperty;\n"
-            "\n"
-            "static void\n"
-            "_changed_property_free (ChangedProperty *data)\n"
-            "{\n"
-            "  g_value_unset (&data->orig_value);\n"
-            "  g_free (data);\n"
-            "}\n"
-            "\n"
-        )
+        if not self.changed_property_array:
+            self.outfile.write(
+                "typedef struct\n"
+                "{\n"
+                "  const _ExtendedGDBusPropertyInfo *info;\n"
+                "  guint prop_id;\n"
+                "  GValue orig_value; /* the value before the change */\n"
+                "} ChangedProperty;\n"
+                "\n"
+                "static void\n"
+                "_changed_property_free (ChangedProperty *data)\n"
+                "{\n"
+                "  g_value_unset (&data->orig_value);\n"
+                "  g_free (data);\n"
+                "}\n"
+                "\n"
+            )
 
         self.outfile.write(
             "static gboolean\n"
@@ -1700,6 +1794,312 @@ class CodeGenerator:
             "\n"
         )
 
+        if self.fast_dispatch or self.proxy_property_cache:
+            # Must compute the same hash as utils.name_hash()
+            self.outfile.write(
+                "G_GNUC_UNUSED static guint32\n"
+                "_g_dbus_codegen_name_hash (const gchar *name, guint32 seed)\n"
+                "{\n"
+                "  guint32 h = seed;\n"
+                "  for (; *name != '\\0'; name++)\n"
+                "    h = (h ^ (guchar) *name) * %uU;\n"
+                "  return h ^ (h >> 16);\n"
+                "}\n"
+                "\n" % utils.NAME_HASH_PRIME
+            )
+
+        if self.proxy_property_batch:
+            self.outfile.write(
+                "typedef struct\n"
+                "{\n"
+                "  guint num_pending;\n"
+                "  GError *error;\n"
+                "} _SetPropertiesData;\n"
+                "\n"
+                "static void\n"
+                "_set_properties_data_free (_SetPropertiesData *data)\n"
+                "{\n"
+                "  g_clear_error (&data->error);\n"
+                "  g_free (data);\n"
+                "}\n"
+                "\n"
+                "static void\n"
+                "_g_dbus_codegen_proxy_set_property_cb (GObject *source_object, GAsyncResult *res, gpointer user_data)\n"
+                "{\n"
+                "  GTask *task = user_data;\n"
+                "  _SetPropertiesData *data = g_task_get_task_data (task);\n"
+                "  GError *error = NULL;\n"
+                "  GVariant *ret;\n"
+                "  ret = g_dbus_proxy_call_finish (G_DBUS_PROXY (source_object), res, &error);\n"
+                "  if (ret != NULL)\n"
+                "    g_variant_unref (ret);\n"
+                "  else if (data->error == NULL)\n"
+                "    data->error = error;\n"
+                "  else\n"
+                "    g_error_free (error);\n"
+                "  data->num_pending--;\n"
+                "  if (data->num_pending == 0)\n"
+                "    {\n"
+                "      if (data->error != NULL)\n"
+                "        {\n"
+                "          g_task_return_error (task, data->error);\n"
+                "          data->error = NULL;\n"
+                "        }\n"
+                "      else\n"
+                "        g_task_return_boolean (task, TRUE);\n"
+                "    }\n"
+                "  g_object_unref (task);\n"
+                "}\n"
+                "\n"
+                "/* The calls are all sent before any reply is handled, as replies are\n"
+                " * only dispatched from the main loop */\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_proxy_set_properties (GDBusProxy *proxy, const gchar *interface_name, GVariant *properties,\n"
+                "  GCancellable *cancellable, GAsyncReadyCallback callback, gpointer user_data)\n"
+                "{\n"
+                "  GDBusInterfaceInfo *interface_info;\n"
+                "  _SetPropertiesData *data;\n"
+                "  GVariantIter iter;\n"
+                "  const gchar *name;\n"
+                "  GVariant *value;\n"
+                "  GTask *task;\n"
+                "  g_return_if_fail (G_IS_DBUS_PROXY (proxy));\n"
+                "  g_return_if_fail (g_variant_is_of_type (properties, G_VARIANT_TYPE_VARDICT));\n"
+                "  task = g_task_new (proxy, cancellable, callback, user_data);\n"
+                "  g_task_set_source_tag (task, _g_dbus_codegen_proxy_set_properties);\n"
+                "  data = g_new0 (_SetPropertiesData, 1);\n"
+                "  g_task_set_task_data (task, data, (GDestroyNotify) _set_properties_data_free);\n"
+                "  g_variant_ref_sink (properties);\n"
+                "  interface_info = g_dbus_proxy_get_interface_info (proxy);\n"
+                "  g_variant_iter_init (&iter, properties);\n"
+                '  while (g_variant_iter_next (&iter, "{&sv}", &name, &value))\n'
+                "    {\n"
+                "      GDBusPropertyInfo *info = g_dbus_interface_info_lookup_property (interface_info, name);\n"
+                "      if (info == NULL)\n"
+                '        g_set_error (&data->error, G_DBUS_ERROR, G_DBUS_ERROR_INVALID_ARGS, "No property with name %s", name);\n'
+                "      else if (!(info->flags & G_DBUS_PROPERTY_INFO_FLAGS_WRITABLE))\n"
+                '        g_set_error (&data->error, G_DBUS_ERROR, G_DBUS_ERROR_INVALID_ARGS, "Property %s is not writable", name);\n'
+                "      else if (!g_variant_is_of_type (value, G_VARIANT_TYPE (info->signature)))\n"
+                '        g_set_error (&data->error, G_DBUS_ERROR, G_DBUS_ERROR_INVALID_ARGS, "Property %s expects type %s but got %s",\n'
+                "                     name, info->signature, g_variant_get_type_string (value));\n"
+                "      g_variant_unref (value);\n"
+                "      if (data->error != NULL)\n"
+                "        {\n"
+                "          g_task_return_error (task, data->error);\n"
+                "          data->error = NULL;\n"
+                "          goto out;\n"
+                "        }\n"
+                "    }\n"
+                "  g_variant_iter_init (&iter, properties);\n"
+                '  while (g_variant_iter_next (&iter, "{&sv}", &name, &value))\n'
+                "    {\n"
+                "      data->num_pending++;\n"
+                "      g_dbus_proxy_call (proxy,\n"
+                '        "org.freedesktop.DBus.Properties.Set",\n'
+                '        g_variant_new ("(ssv)", interface_name, name, value),\n'
+                "        G_DBUS_CALL_FLAGS_NONE,\n"
+                "        -1,\n"
+                "        cancellable, _g_dbus_codegen_proxy_set_property_cb, g_object_ref (task));\n"
+                "      g_variant_unref (value);\n"
+                "    }\n"
+                "  if (data->num_pending == 0)\n"
+                "    g_task_return_boolean (task, TRUE);\n"
+                "out:\n"
+                "  g_variant_unref (properties);\n"
+                "  g_object_unref (task);\n"
+                "}\n"
+                "\n"
+                "/* Values of the wrong type are skipped, as GDBusProxy does */\n"
+                "static void\n"
+                "_g_dbus_codegen_proxy_refresh_all_cb (GObject *source_object, GAsyncResult *res, gpointer user_data)\n"
+                "{\n"
+                "  GDBusProxy *proxy = G_DBUS_PROXY (source_object);\n"
+                "  GTask *task = user_data;\n"
+                "  GDBusInterfaceInfo *interface_info;\n"
+                "  GVariantBuilder changed;\n"
+                "  GVariantIter *iter;\n"
+                "  GError *error = NULL;\n"
+                "  gboolean have_changes = FALSE;\n"
+                "  const gchar *name;\n"
+                "  GVariant *value;\n"
+                "  GVariant *ret;\n"
+                "  ret = g_dbus_proxy_call_finish (proxy, res, &error);\n"
+                "  if (ret == NULL)\n"
+                "    {\n"
+                "      g_task_return_error (task, error);\n"
+                "      g_object_unref (task);\n"
+                "      return;\n"
+                "    }\n"
+                "  interface_info = g_dbus_proxy_get_interface_info (proxy);\n"
+                '  g_variant_builder_init (&changed, G_VARIANT_TYPE ("a{sv}"));\n'
+                '  g_variant_get (ret, "(a{sv})", &iter);\n'
+                '  while (g_variant_iter_next (iter, "{&sv}", &name, &value))\n'
+                "    {\n"
+                "      GDBusPropertyInfo *info = g_dbus_interface_info_lookup_property (interface_info, name);\n"
+                "      GVariant *cached;\n"
+                "      if (info == NULL || g_variant_is_of_type (value, G_VARIANT_TYPE (info->signature)))\n"
+                "        {\n"
+                "          cached = g_dbus_proxy_get_cached_property (proxy, name);\n"
+                "          if (cached == NULL || !g_variant_equal (cached, value))\n"
+                "            {\n"
+                "              g_dbus_proxy_set_cached_property (proxy, name, value);\n"
+                '              g_variant_builder_add (&changed, "{sv}", name, value);\n'
+                "              have_changes = TRUE;\n"
+                "            }\n"
+                "          if (cached != NULL)\n"
+                "            g_variant_unref (cached);\n"
+                "        }\n"
+                "      g_variant_unref (value);\n"
+                "    }\n"
+                "  g_variant_iter_free (iter);\n"
+                "  if (have_changes)\n"
+                "    {\n"
+                "      const gchar *invalidated[] = { NULL };\n"
+                '      g_signal_emit_by_name (proxy, "g-properties-changed", g_variant_builder_end (&changed), invalidated);\n'
+                "    }\n"
+                "  else\n"
+                "    g_variant_builder_clear (&changed);\n"
+                "  g_variant_unref (ret);\n"
+                "  g_task_return_boolean (task, TRUE);\n"
+                "  g_object_unref (task);\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_proxy_refresh_all (GDBusProxy *proxy, const gchar *interface_name,\n"
+                "  GCancellable *cancellable, GAsyncReadyCallback callback, gpointer user_data)\n"
+                "{\n"
+                "  GTask *task;\n"
+                "  task = g_task_new (proxy, cancellable, callback, user_data);\n"
+                "  g_task_set_source_tag (task, _g_dbus_codegen_proxy_refresh_all);\n"
+                "  g_dbus_proxy_call (proxy,\n"
+                '    "org.freedesktop.DBus.Properties.GetAll",\n'
+                '    g_variant_new ("(s)", interface_name),\n'
+                "    G_DBUS_CALL_FLAGS_NONE,\n"
+                "    -1,\n"
+                "    cancellable, _g_dbus_codegen_proxy_refresh_all_cb, task);\n"
+                "}\n"
+                "\n"
+            )
+
+        # The statistics of each method are updated under a mutex of their
+        # own, as the times are 64-bit and not every platform the generated
+        # code builds on has 64-bit atomic operations. The time a call was
+        # received at is carried to the complete function in the qdata of
+        # its invocation
+        if self.method_stats:
+            self.outfile.write(
+                "typedef struct\n"
+                "{\n"
+                "  GMutex lock;\n"
+                "  guint num_calls;\n"
+                "  guint num_unhandled;\n"
+                "  guint num_completed;\n"
+                "  gint64 handle_time;\n"
+                "  gint64 complete_time;\n"
+                "  gint64 max_complete_time;\n"
+                "} _MethodStats;\n"
+                "\n"
+                "static GQuark\n"
+                "_g_dbus_codegen_method_stats_quark (void)\n"
+                "{\n"
+                "  static GQuark quark = 0;\n"
+                "  if (G_UNLIKELY (quark == 0))\n"
+                '    quark = g_quark_from_static_string ("g-dbus-codegen-method-start-time");\n'
+                "  return quark;\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_method_stats_init (_MethodStats *stats, guint num_stats)\n"
+                "{\n"
+                "  guint n;\n"
+                "  for (n = 0; n < num_stats; n++)\n"
+                "    g_mutex_init (&stats[n].lock);\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_method_stats_clear (_MethodStats *stats, guint num_stats)\n"
+                "{\n"
+                "  guint n;\n"
+                "  for (n = 0; n < num_stats; n++)\n"
+                "    g_mutex_clear (&stats[n].lock);\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static gint64\n"
+                "_g_dbus_codegen_method_stats_begin (_MethodStats *stats, GDBusMethodInvocation *invocation)\n"
+                "{\n"
+                "  gint64 *start_time = g_new (gint64, 1);\n"
+                "  *start_time = g_get_monotonic_time ();\n"
+                "  g_mutex_lock (&stats->lock);\n"
+                "  stats->num_calls++;\n"
+                "  g_mutex_unlock (&stats->lock);\n"
+                "  g_object_set_qdata_full (G_OBJECT (invocation), _g_dbus_codegen_method_stats_quark (), start_time, g_free);\n"
+                "  return *start_time;\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_method_stats_end (_MethodStats *stats, gint64 start_time, gboolean handled)\n"
+                "{\n"
+                "  gint64 elapsed = g_get_monotonic_time () - start_time;\n"
+                "  g_mutex_lock (&stats->lock);\n"
+                "  if (!handled)\n"
+                "    stats->num_unhandled++;\n"
+                "  stats->handle_time += elapsed;\n"
+                "  g_mutex_unlock (&stats->lock);\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_method_stats_complete (_MethodStats *stats, GDBusMethodInvocation *invocation)\n"
+                "{\n"
+                "  const gint64 *start_time;\n"
+                "  gint64 elapsed;\n"
+                "  start_time = g_object_get_qdata (G_OBJECT (invocation), _g_dbus_codegen_method_stats_quark ());\n"
+                "  if (start_time == NULL)\n"
+                "    return;\n"
+                "  elapsed = g_get_monotonic_time () - *start_time;\n"
+                "  g_mutex_lock (&stats->lock);\n"
+                "  stats->num_completed++;\n"
+                "  stats->complete_time += elapsed;\n"
+                "  if (elapsed > stats->max_complete_time)\n"
+                "    stats->max_complete_time = elapsed;\n"
+                "  g_mutex_unlock (&stats->lock);\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_method_stats_get (_MethodStats *stats,\n"
+                "  guint *out_num_calls, guint *out_num_unhandled, guint *out_num_completed,\n"
+                "  guint64 *out_handle_time, guint64 *out_complete_time, guint64 *out_max_complete_time)\n"
+                "{\n"
+                "  g_mutex_lock (&stats->lock);\n"
+                "  if (out_num_calls != NULL)\n"
+                "    *out_num_calls = stats->num_calls;\n"
+                "  if (out_num_unhandled != NULL)\n"
+                "    *out_num_unhandled = stats->num_unhandled;\n"
+                "  if (out_num_completed != NULL)\n"
+                "    *out_num_completed = stats->num_completed;\n"
+                "  if (out_handle_time != NULL)\n"
+                "    *out_handle_time = (guint64) stats->handle_time;\n"
+                "  if (out_complete_time != NULL)\n"
+                "    *out_complete_time = (guint64) stats->complete_time;\n"
+                "  if (out_max_complete_time != NULL)\n"
+                "    *out_max_complete_time = (guint64) stats->max_complete_time;\n"
+                "  g_mutex_unlock (&stats->lock);\n"
+                "}\n"
+                "\n"
+                "G_GNUC_UNUSED static void\n"
+                "_g_dbus_codegen_method_stats_reset (_MethodStats *stats)\n"
+                "{\n"
+                "  g_mutex_lock (&stats->lock);\n"
+                "  stats->num_calls = 0;\n"
+                "  stats->num_unhandled = 0;\n"
+                "  stats->num_completed = 0;\n"
+                "  stats->handle_time = 0;\n"
+                "  stats->complete_time = 0;\n"
+                "  stats->max_complete_time = 0;\n"
+                "  g_mutex_unlock (&stats->lock);\n"
+                "}\n"
+                "\n"
+            )
+
     def generate_annotations(self, prefix, annotations):
         if annotations is None:
             return
@@ -1796,6 +2196,50 @@ class CodeGenerator:
             "\n"
         )
 
+    def generate_method_signal_ids_for_interface(self, i):
+        if not self.fast_dispatch or not i.methods:
+            return
+
+        self.outfile.write(
+            f"static guint _{i.name_lower}_method_signal_ids[{len(i.methods)}] = {{ 0 }};"
+            "\n"
+            "\n"
+        )
+
+    def generate_perfect_hash_lookup(
+        self, func_name, names, pointers_name, ret_type, ret_found, ret_not_found
+    ):
+        seed, slots = utils.build_perfect_hash(names)
+        slot_type = "gint8" if len(names) < 128 else "gint16"
+        self.outfile.write(
+            "static %s\n"
+            "%s (const gchar *name)\n"
+            "{\n"
+            "  static const %s slots[%d] =\n"
+            "  {\n"
+            "    %s\n"
+            "  };\n"
+            "  gint n;\n"
+            "  n = slots[_g_dbus_codegen_name_hash (name, %uU) & %d];\n"
+            "  if (n < 0 || strcmp (%s[n]->name, name) != 0)\n"
+            "    return %s;\n"
+            "  return %s;\n"
+            "}\n"
+            "\n"
+            % (
+                ret_type,
+                func_name,
+                slot_type,
+                len(slots),
+                ", ".join(str(n) for n in slots),
+                seed,
+                len(slots) - 1,
+                pointers_name,
+                ret_not_found,
+                ret_found,
+            )
+        )
+
     def generate_introspection_for_interface(self, i):
         self.outfile.write(
             "/* ---- Introspection data for %s ---- */\n" "\n" % (i.name)
@@ -2145,7 +2589,7 @@ class CodeGenerator:
             self.outfile.write(
                 "  /* GObject signals for incoming D-Bus method calls: */\n"
             )
-            for m in i.methods:
+            for n, m in enumerate(i.methods):
                 self.outfile.write(
                     self.docbook_gen.expand(
                         "  /**\n"
@@ -2181,6 +2625,10 @@ class CodeGenerator:
                     extra_args = 2
                 else:
                     extra_args = 1
+                if self.fast_dispatch:
+                    self.outfile.write(
+                        "  _%s_method_signal_ids[%d] =\n" % (i.name_lower, n)
+                    )
                 self.outfile.write(
                     '  g_signal_new ("handle-%s",\n'
                     "    G_TYPE_FROM_INTERFACE (iface),\n"
@@ -2991,7 +3439,15 @@ class CodeGenerator:
     # ---------------------------------------------------------------------------------------------------
 
     def generate_method_completers(self, i):
-        for m in i.methods:
+        if self.method_stats and len(i.methods) > 0:
+            self.outfile.write(
+                "static void _%s_skeleton_method_completed (\n"
+                "    %s *object,\n"
+                "    GDBusMethodInvocation *invocation,\n"
+                "    guint method_index);\n"
+                "\n" % (i.name_lower, i.camel_name)
+            )
+        for n, m in enumerate(i.methods):
             self.outfile.write(
                 "/**\n"
                 " * %s_complete_%s:\n"
@@ -3028,6 +3484,11 @@ class CodeGenerator:
             for a in m.out_args:
                 self.outfile.write(",\n    %s%s" % (a.ctype_in, a.name))
             self.outfile.write(")\n" "{\n")
+            if self.method_stats:
+                self.outfile.write(
+                    "  _%s_skeleton_method_completed (object, invocation, %d);\n"
+                    % (i.name_lower, n)
+                )
 
             if m.unix_fd:
                 self.outfile.write(
@@ -3052,7 +3513,138 @@ class CodeGenerator:
 
     # ---------------------------------------------------------------------------------------------------
 
+    def generate_proxy_property_cache(self, i):
+        self.outfile.write(
+            "static void\n"
+            "_%s_proxy_set_cached_property (%sProxy *proxy, guint n, GVariant *variant)\n"
+            "{\n"
+            "  GVariant *old_variant = proxy->priv->cached_properties[n];\n"
+            "  proxy->priv->cached_properties[n] = variant != NULL ? g_variant_ref (variant) : NULL;\n"
+            "  switch (n)\n"
+            "    {\n" % (i.name_lower, i.camel_name)
+        )
+        for n, p in enumerate(i.properties):
+            # The variant itself is all that is kept of a property of type
+            # GVariant
+            if p.arg.gtype == "G_TYPE_VARIANT":
+                continue
+            self.outfile.write("    case %d:\n" % n)
+            extra_len = ""
+            if (
+                p.arg.gvariant_get == "g_variant_get_strv"
+                or p.arg.gvariant_get == "g_variant_get_objv"
+                or p.arg.gvariant_get == "g_variant_get_bytestring_array"
+            ):
+                self.outfile.write(
+                    "      g_free ((gpointer) proxy->priv->cached_%s);\n"
+                    % (p.name_lower)
+                )
+                extra_len = ", NULL"
+            elif p.arg.gvariant_get == "g_variant_get_string":
+                extra_len = ", NULL"
+            self.outfile.write(
+                "      proxy->priv->cached_%s = variant != NULL ? %s (variant%s) : %s;\n"
+                "      break;\n"
+                % (
+                    p.name_lower,
+                    p.arg.gvariant_get,
+                    extra_len,
+                    p.arg.ctype_in_default_value,
+                )
+            )
+        self.outfile.write(
+            "    default:\n"
+            "      break;\n"
+            "    }\n"
+            "  if (old_variant != NULL)\n"
+            "    g_variant_unref (old_variant);\n"
+            "}\n"
+            "\n"
+        )
+        self.outfile.write(
+            "static void\n"
+            "_%s_proxy_load_cached_property (%sProxy *proxy, guint n)\n"
+            "{\n"
+            "  GVariant *variant;\n"
+            "  variant = g_dbus_proxy_get_cached_property (G_DBUS_PROXY (proxy), _%s_property_info_pointers[n]->name);\n"
+            "  if (variant != NULL)\n"
+            "    {\n"
+            "      _%s_proxy_set_cached_property (proxy, n, variant);\n"
+            "      g_variant_unref (variant);\n"
+            "    }\n"
+            "}\n"
+            "\n" % (i.name_lower, i.camel_name, i.name_lower, i.name_lower)
+        )
+        self.outfile.write(
+            "static void\n"
+            "_%s_proxy_clear_cached_properties (%sProxy *proxy)\n"
+            "{\n"
+            "  guint n;\n"
+            "  for (n = 0; n < %d; n++)\n"
+            "    _%s_proxy_set_cached_property (proxy, n, NULL);\n"
+            "}\n"
+            "\n" % (i.name_lower, i.camel_name, len(i.properties), i.name_lower)
+        )
+        # GDBusProxy does not cache a value of the wrong type, so neither do we
+        self.outfile.write(
+            "static void\n"
+            "_%s_proxy_update_cached_properties (GDBusProxy *_proxy,\n"
+            "  GVariant *changed_properties,\n"
+            "  const gchar *const *invalidated_properties,\n"
+            "  gpointer user_data G_GNUC_UNUSED)\n"
+            "{\n"
+            "  %sProxy *proxy = %s%s_PROXY (_proxy);\n"
+            "  GVariantIter iter;\n"
+            "  const gchar *key;\n"
+            "  GVariant *value;\n"
+            "  guint i;\n"
+            "  gint n;\n"
+            "  g_variant_iter_init (&iter, changed_properties);\n"
+            '  while (g_variant_iter_next (&iter, "{&sv}", &key, &value))\n'
+            "    {\n"
+            "      n = _%s_proxy_lookup_property (key);\n"
+            "      if (n >= 0)\n"
+            "        _%s_proxy_set_cached_property (proxy, n,\n"
+            "          g_variant_is_of_type (value, G_VARIANT_TYPE (_%s_property_info_pointers[n]->signature)) ? value : NULL);\n"
+            "      g_variant_unref (value);\n"
+            "    }\n"
+            "  for (i = 0; invalidated_properties[i] != NULL; i++)\n"
+            "    {\n"
+            "      n = _%s_proxy_lookup_property (invalidated_properties[i]);\n"
+            "      if (n >= 0)\n"
+            "        _%s_proxy_set_cached_property (proxy, n, NULL);\n"
+            "    }\n"
+            "}\n"
+            "\n"
+            % (
+                i.name_lower,
+                i.camel_name,
+                i.ns_upper,
+                i.name_upper,
+                i.name_lower,
+                i.name_lower,
+                i.name_lower,
+                i.name_lower,
+                i.name_lower,
+            )
+        )
+        self.outfile.write(
+            "static void\n"
+            "_%s_proxy_on_notify_g_name_owner (GObject *object,\n"
+            "  GParamSpec *pspec G_GNUC_UNUSED,\n"
+            "  gpointer user_data G_GNUC_UNUSED)\n"
+            "{\n"
+            "  _%s_proxy_clear_cached_properties (%s%s_PROXY (object));\n"
+            "}\n"
+            "\n" % (i.name_lower, i.name_lower, i.ns_upper, i.name_upper)
+        )
+
     def generate_proxy(self, i):
+        # With the property cache, the value of each property is kept in the
+        # private struct, converted to its C type, and updated when the
+        # property changes rather than when it is read
+        property_cache = self.proxy_property_cache and len(i.properties) > 0
+
         # class boilerplate
         self.outfile.write(
             "/* ------------------------------------------------------------------------ */\n"
@@ -3085,13 +3677,33 @@ class CodeGenerator:
         self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
         self.outfile.write("\n")
 
+        if property_cache:
+            self.generate_perfect_hash_lookup(
+                "_%s_proxy_lookup_property" % i.name_lower,
+                [p.name for p in i.properties],
+                "_%s_property_info_pointers" % i.name_lower,
+                "gint",
+                "n",
+                "-1",
+            )
+
         self.outfile.write(
-            "struct _%sProxyPrivate\n"
-            "{\n"
-            "  GData *qdata;\n"
-            "};\n"
-            "\n" % i.camel_name
+            "struct _%sProxyPrivate\n" "{\n" "  GData *qdata;\n" % i.camel_name
         )
+        if property_cache:
+            self.outfile.write(
+                "  GVariant *cached_properties[%d]; /* by prop_id - 1 */\n"
+                % len(i.properties)
+            )
+            for p in i.properties:
+                if p.arg.gtype != "G_TYPE_VARIANT":
+                    self.outfile.write(
+                        "  %scached_%s;\n" % (p.arg.ctype_in, p.name_lower)
+                    )
+        self.outfile.write("};\n" "\n")
+
+        if property_cache:
+            self.generate_proxy_property_cache(i)
 
         self.outfile.write(
             "static void %s_proxy_iface_init (%sIface *iface);\n"
@@ -3130,6 +3742,10 @@ class CodeGenerator:
             "  %sProxy *proxy = %s%s_PROXY (object);\n"
             % (i.camel_name, i.ns_upper, i.name_upper)
         )
+        if property_cache:
+            self.outfile.write(
+                "  _%s_proxy_clear_cached_properties (proxy);\n" % (i.name_lower)
+            )
         self.outfile.write("  g_datalist_clear (&proxy->priv->qdata);\n")
         self.outfile.write(
             "  G_OBJECT_CLASS (%s_proxy_parent_class)->finalize (object);\n"
@@ -3298,42 +3914,114 @@ class CodeGenerator:
         self.outfile.write("}\n" "\n")
 
         # property changed
-        self.outfile.write(
-            "static void\n"
-            "%s_proxy_g_properties_changed (GDBusProxy *_proxy,\n"
-            "  GVariant *changed_properties,\n"
-            "  const gchar *const *invalidated_properties)\n"
-            "{\n" % (i.name_lower)
-        )
-        # Note: info could be NULL if we are talking to a newer version of the interface
-        self.outfile.write(
-            "  %sProxy *proxy = %s%s_PROXY (_proxy);\n"
-            "  guint n;\n"
-            "  const gchar *key;\n"
-            "  GVariantIter *iter;\n"
-            "  _ExtendedGDBusPropertyInfo *info;\n"
-            '  g_variant_get (changed_properties, "a{sv}", &iter);\n'
-            '  while (g_variant_iter_next (iter, "{&sv}", &key, NULL))\n'
-            "    {\n"
-            "      info = (_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, key);\n"
-            "      g_datalist_remove_data (&proxy->priv->qdata, key);\n"
-            "      if (info != NULL)\n"
-            "        g_object_notify (G_OBJECT (proxy), info->hyphen_name);\n"
-            "    }\n"
-            "  g_variant_iter_free (iter);\n"
-            "  for (n = 0; invalidated_properties[n] != NULL; n++)\n"
-            "    {\n"
-            "      info = (_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, invalidated_properties[n]);\n"
-            "      g_datalist_remove_data (&proxy->priv->qdata, invalidated_properties[n]);\n"
-            "      if (info != NULL)\n"
-            "        g_object_notify (G_OBJECT (proxy), info->hyphen_name);\n"
-            "    }\n"
-            "}\n"
-            "\n" % (i.camel_name, i.ns_upper, i.name_upper, i.name_lower, i.name_lower)
-        )
+        if property_cache:
+            # The cached values are up to date by the time the vfunc runs, so
+            # it only has to notify
+            self.outfile.write(
+                "static void\n"
+                "%s_proxy_g_properties_changed (GDBusProxy *_proxy,\n"
+                "  GVariant *changed_properties,\n"
+                "  const gchar *const *invalidated_properties)\n"
+                "{\n"
+                "  %sProxy *proxy = %s%s_PROXY (_proxy);\n"
+                "  GVariantIter iter;\n"
+                "  const gchar *key;\n"
+                "  guint i;\n"
+                "  gint n;\n"
+                "  g_variant_iter_init (&iter, changed_properties);\n"
+                '  while (g_variant_iter_next (&iter, "{&sv}", &key, NULL))\n'
+                "    {\n"
+                "      n = _%s_proxy_lookup_property (key);\n"
+                "      if (n >= 0)\n"
+                "        g_object_notify (G_OBJECT (proxy), ((const _ExtendedGDBusPropertyInfo *) _%s_property_info_pointers[n])->hyphen_name);\n"
+                "    }\n"
+                "  for (i = 0; invalidated_properties[i] != NULL; i++)\n"
+                "    {\n"
+                "      n = _%s_proxy_lookup_property (invalidated_properties[i]);\n"
+                "      if (n >= 0)\n"
+                "        g_object_notify (G_OBJECT (proxy), ((const _ExtendedGDBusPropertyInfo *) _%s_property_info_pointers[n])->hyphen_name);\n"
+                "    }\n"
+                "}\n"
+                "\n"
+                % (
+                    i.name_lower,
+                    i.camel_name,
+                    i.ns_upper,
+                    i.name_upper,
+                    i.name_lower,
+                    i.name_lower,
+                    i.name_lower,
+                    i.name_lower,
+                )
+            )
+        else:
+            self.outfile.write(
+                "static void\n"
+                "%s_proxy_g_properties_changed (GDBusProxy *_proxy,\n"
+                "  GVariant *changed_properties,\n"
+                "  const gchar *const *invalidated_properties)\n"
+                "{\n" % (i.name_lower)
+            )
+            # Note: info could be NULL if we are talking to a newer version of the interface
+            self.outfile.write(
+                "  %sProxy *proxy = %s%s_PROXY (_proxy);\n"
+                "  guint n;\n"
+                "  const gchar *key;\n"
+                "  GVariantIter *iter;\n"
+                "  _ExtendedGDBusPropertyInfo *info;\n"
+                '  g_variant_get (changed_properties, "a{sv}", &iter);\n'
+                '  while (g_variant_iter_next (iter, "{&sv}", &key, NULL))\n'
+                "    {\n"
+                "      info = (_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, key);\n"
+                "      g_datalist_remove_data (&proxy->priv->qdata, key);\n"
+                "      if (info != NULL)\n"
+                "        g_object_notify (G_OBJECT (proxy), info->hyphen_name);\n"
+                "    }\n"
+                "  g_variant_iter_free (iter);\n"
+                "  for (n = 0; invalidated_properties[n] != NULL; n++)\n"
+                "    {\n"
+                "      info = (_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, invalidated_properties[n]);\n"
+                "      g_datalist_remove_data (&proxy->priv->qdata, invalidated_properties[n]);\n"
+                "      if (info != NULL)\n"
+                "        g_object_notify (G_OBJECT (proxy), info->hyphen_name);\n"
+                "    }\n"
+                "}\n"
+                "\n"
+                % (i.camel_name, i.ns_upper, i.name_upper, i.name_lower, i.name_lower)
+            )
 
         # property vfuncs
-        for p in i.properties:
+        for n, p in enumerate(i.properties):
+            if property_cache:
+                if p.arg.gtype == "G_TYPE_VARIANT":
+                    cached_value = "cached_properties[%d]" % n
+                else:
+                    cached_value = "cached_%s" % p.name_lower
+                self.outfile.write(
+                    "static %s\n"
+                    "%s_proxy_get_%s (%s *object)\n"
+                    "{\n"
+                    "  %sProxy *proxy = %s%s_PROXY (object);\n"
+                    "  if (G_UNLIKELY (proxy->priv->cached_properties[%d] == NULL))\n"
+                    "    _%s_proxy_load_cached_property (proxy, %d);\n"
+                    "  return proxy->priv->%s;\n"
+                    "}\n"
+                    "\n"
+                    % (
+                        p.arg.ctype_in,
+                        i.name_lower,
+                        p.name_lower,
+                        i.camel_name,
+                        i.camel_name,
+                        i.ns_upper,
+                        i.name_upper,
+                        n,
+                        i.name_lower,
+                        n,
+                        cached_value,
+                    )
+                )
+                continue
             self.outfile.write(
                 "static %s\n"
                 "%s_proxy_get_%s (%s *object)\n"
@@ -3418,8 +4106,6 @@ class CodeGenerator:
             "  proxy->priv = G_TYPE_INSTANCE_GET_PRIVATE (proxy, %sTYPE_%s_PROXY, %sProxyPrivate);\n"
             "#endif\n\n"
             "  g_dbus_proxy_set_interface_info (G_DBUS_PROXY (proxy), %s_interface_info ());\n"
-            "}\n"
-            "\n"
             % (
                 i.name_lower,
                 i.camel_name,
@@ -3430,6 +4116,13 @@ class CodeGenerator:
                 i.name_lower,
             )
         )
+        if property_cache:
+            self.outfile.write(
+                '  g_signal_connect (proxy, "g-properties-changed", G_CALLBACK (_%s_proxy_update_cached_properties), NULL);\n'
+                '  g_signal_connect (proxy, "notify::g-name-owner", G_CALLBACK (_%s_proxy_on_notify_g_name_owner), NULL);\n'
+                % (i.name_lower, i.name_lower)
+            )
+        self.outfile.write("}\n" "\n")
         self.outfile.write(
             "static void\n"
             "%s_proxy_class_init (%sProxyClass *klass)\n"
@@ -3725,9 +4418,300 @@ class CodeGenerator:
         )
         self.outfile.write("\n")
 
+        if self.proxy_property_batch and len(i.properties) > 0:
+            self.outfile.write(
+                self.docbook_gen.expand(
+                    "/**\n"
+                    " * %s_proxy_set_properties:\n"
+                    " * @proxy: A #%sProxy.\n"
+                    " * @properties: A #GVariant of type <literal>a{sv}</literal> mapping D-Bus property names to their new values. If it is floating, it is consumed.\n"
+                    " * @cancellable: (nullable): A #GCancellable or %%NULL.\n"
+                    " * @callback: A #GAsyncReadyCallback to call when the request is satisfied.\n"
+                    " * @user_data: User data to pass to @callback.\n"
+                    " *\n"
+                    " * Asynchronously sets several properties of the remote object. One <literal>org.freedesktop.DBus.Properties.Set</literal> call is sent for each property, all of them without waiting for the replies, and the operation completes when every call has been answered.\n"
+                    " *\n"
+                    " * If a property is unknown, not writable or given a value of the wrong type, the operation fails with %%G_DBUS_ERROR_INVALID_ARGS and nothing is sent. Otherwise, the first error returned by the remote object is reported, and the other properties may have been set.\n"
+                    " *\n"
+                    " * When the operation is finished, @callback will be invoked in the thread-default main loop of the thread you are calling this method from (see g_main_context_push_thread_default()).\n"
+                    " * You can then call %s_proxy_set_properties_finish() to get the result of the operation.\n"
+                    % (i.name_lower, i.camel_name, i.name_lower),
+                    False,
+                )
+            )
+            self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
+            self.outfile.write(
+                "void\n"
+                "%s_proxy_set_properties (\n"
+                "    %sProxy *proxy,\n"
+                "    GVariant            *properties,\n"
+                "    GCancellable        *cancellable,\n"
+                "    GAsyncReadyCallback  callback,\n"
+                "    gpointer             user_data)\n"
+                "{\n"
+                '  _g_dbus_codegen_proxy_set_properties (G_DBUS_PROXY (proxy), "%s", properties, cancellable, callback, user_data);\n'
+                "}\n"
+                "\n" % (i.name_lower, i.camel_name, i.name)
+            )
+            self.outfile.write(
+                "/**\n"
+                " * %s_proxy_set_properties_finish:\n"
+                " * @proxy: A #%sProxy.\n"
+                " * @res: The #GAsyncResult obtained from the #GAsyncReadyCallback passed to %s_proxy_set_properties().\n"
+                " * @error: Return location for error or %%NULL\n"
+                " *\n"
+                " * Finishes an operation started with %s_proxy_set_properties().\n"
+                " *\n"
+                " * Returns: %%TRUE if every property was set, %%FALSE if @error is set.\n"
+                % (i.name_lower, i.camel_name, i.name_lower, i.name_lower)
+            )
+            self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
+            self.outfile.write(
+                "gboolean\n"
+                "%s_proxy_set_properties_finish (\n"
+                "    %sProxy *proxy,\n"
+                "    GAsyncResult        *res,\n"
+                "    GError             **error)\n"
+                "{\n"
+                "  g_return_val_if_fail (g_task_is_valid (res, proxy), FALSE);\n"
+                "  return g_task_propagate_boolean (G_TASK (res), error);\n"
+                "}\n"
+                "\n" % (i.name_lower, i.camel_name)
+            )
+            self.outfile.write(
+                self.docbook_gen.expand(
+                    "/**\n"
+                    " * %s_proxy_refresh_all:\n"
+                    " * @proxy: A #%sProxy.\n"
+                    " * @cancellable: (nullable): A #GCancellable or %%NULL.\n"
+                    " * @callback: A #GAsyncReadyCallback to call when the request is satisfied.\n"
+                    " * @user_data: User data to pass to @callback.\n"
+                    " *\n"
+                    " * Asynchronously reads all properties of the remote object with one <literal>org.freedesktop.DBus.Properties.GetAll</literal> call and updates the properties cached by @proxy. The #GDBusProxy::g-properties-changed signal is emitted for the values that changed.\n"
+                    " *\n"
+                    " * When the operation is finished, @callback will be invoked in the thread-default main loop of the thread you are calling this method from (see g_main_context_push_thread_default()).\n"
+                    " * You can then call %s_proxy_refresh_all_finish() to get the result of the operation.\n"
+                    % (i.name_lower, i.camel_name, i.name_lower),
+                    False,
+                )
+            )
+            self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
+            self.outfile.write(
+                "void\n"
+                "%s_proxy_refresh_all (\n"
+                "    %sProxy *proxy,\n"
+                "    GCancellable        *cancellable,\n"
+                "    GAsyncReadyCallback  callback,\n"
+                "    gpointer             user_data)\n"
+                "{\n"
+                '  _g_dbus_codegen_proxy_refresh_all (G_DBUS_PROXY (proxy), "%s", cancellable, callback, user_data);\n'
+                "}\n"
+                "\n" % (i.name_lower, i.camel_name, i.name)
+            )
+            self.outfile.write(
+                "/**\n"
+                " * %s_proxy_refresh_all_finish:\n"
+                " * @proxy: A #%sProxy.\n"
+                " * @res: The #GAsyncResult obtained from the #GAsyncReadyCallback passed to %s_proxy_refresh_all().\n"
+                " * @error: Return location for error or %%NULL\n"
+                " *\n"
+                " * Finishes an operation started with %s_proxy_refresh_all().\n"
+                " *\n"
+                " * Returns: %%TRUE if the properties were read, %%FALSE if @error is set.\n"
+                % (i.name_lower, i.camel_name, i.name_lower, i.name_lower)
+            )
+            self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
+            self.outfile.write(
+                "gboolean\n"
+                "%s_proxy_refresh_all_finish (\n"
+                "    %sProxy *proxy,\n"
+                "    GAsyncResult        *res,\n"
+                "    GError             **error)\n"
+                "{\n"
+                "  g_return_val_if_fail (g_task_is_valid (res, proxy), FALSE);\n"
+                "  return g_task_propagate_boolean (G_TASK (res), error);\n"
+                "}\n"
+                "\n" % (i.name_lower, i.camel_name)
+            )
+
     # ---------------------------------------------------------------------------------------------------
 
+    def generate_skeleton_method_handlers(self, i):
+        # Each method is handled by a function of its own, which knows the
+        # arguments of the method and so can convert them with the getter
+        # for their type into a GValue array on the stack
+        for n, m in enumerate(i.methods):
+            num_values = 2
+            if m.unix_fd:
+                num_values += 1
+            num_values += len(m.in_args)
+            self.outfile.write(
+                "static void\n"
+                "_%s_skeleton_invoke_%s (\n"
+                "  %sSkeleton *skeleton,\n"
+                "  GVariant *parameters%s,\n"
+                "  GDBusMethodInvocation *invocation)\n"
+                "{\n"
+                % (
+                    i.name_lower,
+                    m.name_lower,
+                    i.camel_name,
+                    "" if len(m.in_args) > 0 else " G_GNUC_UNUSED",
+                )
+            )
+            if len(m.in_args) > 0:
+                self.outfile.write("  GVariant *children[%d];\n" % (len(m.in_args)))
+            self.outfile.write(
+                "  GValue paramv[%d] = { %s };\n"
+                "  GValue return_value = G_VALUE_INIT;\n"
+                "  guint n;\n" % (num_values, ", ".join(["G_VALUE_INIT"] * num_values))
+            )
+            if self.method_stats:
+                self.outfile.write(
+                    "  gint64 start_time;\n"
+                    "  start_time = _g_dbus_codegen_method_stats_begin (&skeleton->priv->method_stats[%d], invocation);\n"
+                    % (n)
+                )
+            self.outfile.write(
+                "  g_value_init (&paramv[0], %sTYPE_%s);\n"
+                "  g_value_set_object (&paramv[0], skeleton);\n"
+                "  g_value_init (&paramv[1], G_TYPE_DBUS_METHOD_INVOCATION);\n"
+                "  g_value_set_object (&paramv[1], invocation);\n"
+                % (i.ns_upper, i.name_upper)
+            )
+            k = 2
+            if m.unix_fd:
+                self.outfile.write(
+                    "#ifdef G_OS_UNIX\n"
+                    "  g_value_init (&paramv[%d], G_TYPE_UNIX_FD_LIST);\n"
+                    "  g_value_set_object (&paramv[%d], g_dbus_message_get_unix_fd_list (g_dbus_method_invocation_get_message (invocation)));\n"
+                    "#else\n"
+                    "  g_assert_not_reached ();\n"
+                    "#endif\n" % (k, k)
+                )
+                k += 1
+            for c, a in enumerate(m.in_args):
+                self.outfile.write(
+                    "  children[%d] = g_variant_get_child_value (parameters, %d);\n"
+                    % (c, c)
+                )
+                if a.gtype == "G_TYPE_VARIANT":
+                    if utils.lookup_annotation(
+                        a.annotations, "org.gtk.GDBus.C.ForceGVariant"
+                    ):
+                        self.outfile.write(
+                            "  g_value_init (&paramv[%d], G_TYPE_VARIANT);\n"
+                            "  g_value_set_variant (&paramv[%d], children[%d]);\n"
+                            % (k, k, c)
+                        )
+                    else:
+                        # Keep the conversions g_dbus_gvariant_to_gvalue() does
+                        # for types which have no C type of their own, e.g. of
+                        # handles to ints
+                        self.outfile.write(
+                            "  g_dbus_gvariant_to_gvalue (children[%d], &paramv[%d]);\n"
+                            % (c, k)
+                        )
+                elif a.gtype == "G_TYPE_STRING":
+                    # The strings are only borrowed from the children, which
+                    # outlive the signal emission
+                    if a.signature == "ay":
+                        get_value = "g_variant_get_bytestring (children[%d])" % c
+                    else:
+                        get_value = "g_variant_get_string (children[%d], NULL)" % c
+                    self.outfile.write(
+                        "  g_value_init (&paramv[%d], G_TYPE_STRING);\n"
+                        "  g_value_set_static_string (&paramv[%d], %s);\n"
+                        % (k, k, get_value)
+                    )
+                elif a.gtype == "G_TYPE_STRV":
+                    self.outfile.write(
+                        "  g_value_init (&paramv[%d], G_TYPE_STRV);\n"
+                        "  g_value_take_boxed (&paramv[%d], %s (children[%d], NULL));\n"
+                        % (k, k, a.gvariant_get.replace("_get_", "_dup_"), c)
+                    )
+                else:
+                    self.outfile.write(
+                        "  g_value_init (&paramv[%d], %s);\n"
+                        "  %s (&paramv[%d], %s (children[%d]));\n"
+                        % (k, a.gtype, a.gvalue_set, k, a.gvariant_get, c)
+                    )
+                k += 1
+
+            if self.fast_dispatch:
+                signal_id = "_%s_method_signal_ids[%d]" % (i.name_lower, n)
+            else:
+                signal_id = 'g_signal_lookup ("handle-%s", %sTYPE_%s)' % (
+                    m.name_hyphen,
+                    i.ns_upper,
+                    i.name_upper,
+                )
+            self.outfile.write(
+                "  g_value_init (&return_value, G_TYPE_BOOLEAN);\n"
+                "  g_signal_emitv (paramv, %s, 0, &return_value);\n"
+                "  if (!g_value_get_boolean (&return_value))\n"
+                '    g_dbus_method_invocation_return_error_literal (invocation, G_DBUS_ERROR, G_DBUS_ERROR_UNKNOWN_METHOD, "Method %s is not implemented on interface %s");\n'
+                % (signal_id, m.name, i.name)
+            )
+            if self.method_stats:
+                self.outfile.write(
+                    "  _g_dbus_codegen_method_stats_end (&skeleton->priv->method_stats[%d], start_time, g_value_get_boolean (&return_value));\n"
+                    % (n)
+                )
+            self.outfile.write(
+                "  g_value_unset (&return_value);\n"
+                "  for (n = 0; n < %d; n++)\n"
+                "    g_value_unset (&paramv[n]);\n" % (num_values)
+            )
+            if len(m.in_args) > 0:
+                self.outfile.write(
+                    "  for (n = 0; n < %d; n++)\n"
+                    "    g_variant_unref (children[n]);\n" % (len(m.in_args))
+                )
+            self.outfile.write("}\n" "\n")
+
+        self.outfile.write(
+            "static void\n"
+            "_%s_skeleton_handle_method_call (\n"
+            "  GDBusConnection *connection G_GNUC_UNUSED,\n"
+            "  const gchar *sender G_GNUC_UNUSED,\n"
+            "  const gchar *object_path G_GNUC_UNUSED,\n"
+            "  const gchar *interface_name G_GNUC_UNUSED,\n"
+            "  const gchar *method_name G_GNUC_UNUSED,\n"
+            "  GVariant *parameters,\n"
+            "  GDBusMethodInvocation *invocation,\n"
+            "  gpointer user_data)\n"
+            "{\n"
+            "  %sSkeleton *skeleton = %s%s_SKELETON (user_data);\n"
+            "  const GDBusMethodInfo *info;\n"
+            "  info = g_dbus_method_invocation_get_method_info (invocation);\n"
+            % (i.name_lower, i.camel_name, i.ns_upper, i.name_upper)
+        )
+        for n, m in enumerate(i.methods):
+            self.outfile.write(
+                "  %sif (info == &_%s_method_info_%s.parent_struct)\n"
+                "    _%s_skeleton_invoke_%s (skeleton, parameters, invocation);\n"
+                % (
+                    "else " if n > 0 else "",
+                    i.name_lower,
+                    m.name_lower,
+                    i.name_lower,
+                    m.name_lower,
+                )
+            )
+        self.outfile.write("  else\n" "    g_assert_not_reached ();\n" "}\n" "\n")
+
     def generate_skeleton(self, i):
+        # The method of a call is found by its position in the interface
+        # info, unless each method is handled by a function of its own
+        method_stats = self.method_stats and len(i.methods) > 0
+        # With the org.gtk.GDBus.C.PropertiesChangedMinInterval annotation,
+        # the changes made within the interval following a PropertiesChanged
+        # signal are held back by a timeout source until the interval has
+        # passed, and then sent in one signal. Changes made after a quiet
+        # period are still sent from an idle source.
+        rate_limited = i.properties_changed_min_interval > 0 and len(i.properties) > 0
+
         # class boilerplate
         self.outfile.write(
             "/* ------------------------------------------------------------------------ */\n"
@@ -3760,98 +4744,183 @@ class CodeGenerator:
         self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
         self.outfile.write("\n")
 
-        self.outfile.write(
-            "struct _%sSkeletonPrivate\n"
-            "{\n"
-            "  GValue *properties;\n"
-            "  GList *changed_properties;\n"
-            "  GSource *changed_properties_idle_source;\n"
-            "  GMainContext *context;\n"
-            "  GMutex lock;\n"
-            "};\n"
-            "\n" % i.camel_name
-        )
-
-        self.outfile.write(
-            "static void\n"
-            "_%s_skeleton_handle_method_call (\n"
-            "  GDBusConnection *connection G_GNUC_UNUSED,\n"
-            "  const gchar *sender G_GNUC_UNUSED,\n"
-            "  const gchar *object_path G_GNUC_UNUSED,\n"
-            "  const gchar *interface_name,\n"
-            "  const gchar *method_name,\n"
-            "  GVariant *parameters,\n"
-            "  GDBusMethodInvocation *invocation,\n"
-            "  gpointer user_data)\n"
-            "{\n"
-            "  %sSkeleton *skeleton = %s%s_SKELETON (user_data);\n"
-            "  _ExtendedGDBusMethodInfo *info;\n"
-            "  GVariantIter iter;\n"
-            "  GVariant *child;\n"
-            "  GValue *paramv;\n"
-            "  gsize num_params;\n"
-            "  guint num_extra;\n"
-            "  gsize n;\n"
-            "  guint signal_id;\n"
-            "  GValue return_value = G_VALUE_INIT;\n"
-            % (i.name_lower, i.camel_name, i.ns_upper, i.name_upper)
-        )
-        self.outfile.write(
-            "  info = (_ExtendedGDBusMethodInfo *) g_dbus_method_invocation_get_method_info (invocation);\n"
-            "  g_assert (info != NULL);\n"
-        )
-        self.outfile.write(
-            "  num_params = g_variant_n_children (parameters);\n"
-            "  num_extra = info->pass_fdlist ? 3 : 2;"
-            "  paramv = g_new0 (GValue, num_params + num_extra);\n"
-            "  n = 0;\n"
-            "  g_value_init (&paramv[n], %sTYPE_%s);\n"
-            "  g_value_set_object (&paramv[n++], skeleton);\n"
-            "  g_value_init (&paramv[n], G_TYPE_DBUS_METHOD_INVOCATION);\n"
-            "  g_value_set_object (&paramv[n++], invocation);\n"
-            "  if (info->pass_fdlist)\n"
-            "    {\n"
-            "#ifdef G_OS_UNIX\n"
-            "      g_value_init (&paramv[n], G_TYPE_UNIX_FD_LIST);\n"
-            "      g_value_set_object (&paramv[n++], g_dbus_message_get_unix_fd_list (g_dbus_method_invocation_get_message (invocation)));\n"
-            "#else\n"
-            "      g_assert_not_reached ();\n"
-            "#endif\n"
-            "    }\n" % (i.ns_upper, i.name_upper)
-        )
-        self.outfile.write(
-            "  g_variant_iter_init (&iter, parameters);\n"
-            "  while ((child = g_variant_iter_next_value (&iter)) != NULL)\n"
-            "    {\n"
-            "      _ExtendedGDBusArgInfo *arg_info = (_ExtendedGDBusArgInfo *) info->parent_struct.in_args[n - num_extra];\n"
-            "      if (arg_info->use_gvariant)\n"
-            "        {\n"
-            "          g_value_init (&paramv[n], G_TYPE_VARIANT);\n"
-            "          g_value_set_variant (&paramv[n], child);\n"
-            "          n++;\n"
-            "        }\n"
-            "      else\n"
-            "        g_dbus_gvariant_to_gvalue (child, &paramv[n++]);\n"
-            "      g_variant_unref (child);\n"
-            "    }\n"
+        # With fast dispatch, the method and property names are looked up in
+        # perfect hash tables built here rather than by a scan of the
+        # interface info, and the signal of each method is looked up once
+        # when it is created
+        method_signal_id = "g_signal_lookup (info->signal_name, %sTYPE_%s)" % (
+            i.ns_upper,
+            i.name_upper,
         )
-        self.outfile.write(
-            "  signal_id = g_signal_lookup (info->signal_name, %sTYPE_%s);\n"
-            % (i.ns_upper, i.name_upper)
+        property_info = (
+            "(_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, property_name)"
+            % (i.name_lower)
         )
+        if self.fast_dispatch and len(i.methods) > 0 and not self.method_handlers:
+            self.generate_perfect_hash_lookup(
+                "_%s_skeleton_lookup_method_signal" % i.name_lower,
+                [m.name for m in i.methods],
+                "_%s_method_info_pointers" % i.name_lower,
+                "guint",
+                "_%s_method_signal_ids[n]" % i.name_lower,
+                "0",
+            )
+            method_signal_id = (
+                "_%s_skeleton_lookup_method_signal (method_name)" % i.name_lower
+            )
+        if self.fast_dispatch and len(i.properties) > 0:
+            self.generate_perfect_hash_lookup(
+                "_%s_skeleton_lookup_property" % i.name_lower,
+                [p.name for p in i.properties],
+                "_%s_property_info_pointers" % i.name_lower,
+                "_ExtendedGDBusPropertyInfo *",
+                "(_ExtendedGDBusPropertyInfo *) _%s_property_info_pointers[n]"
+                % i.name_lower,
+                "NULL",
+            )
+            property_info = (
+                "_%s_skeleton_lookup_property (property_name)" % i.name_lower
+            )
+
+        # With --c-generate-changed-property-array, the value of each property
+        # before its first change is kept in an array indexed by prop_id - 1,
+        # so a change is recorded without searching a list. Unchanged
+        # properties have an unset GValue.
         self.outfile.write(
-            "  g_value_init (&return_value, G_TYPE_BOOLEAN);\n"
-            "  g_signal_emitv (paramv, signal_id, 0, &return_value);\n"
-            "  if (!g_value_get_boolean (&return_value))\n"
-            '    g_dbus_method_invocation_return_error (invocation, G_DBUS_ERROR, G_DBUS_ERROR_UNKNOWN_METHOD, "Method %s is not implemented on interface %s", method_name, interface_name);\n'
-            "  g_value_unset (&return_value);\n"
+            "struct _%sSkeletonPrivate\n" "{\n" "  GValue *properties;\n" % i.camel_name
         )
+        if not self.changed_property_array:
+            self.outfile.write("  GList *changed_properties;\n")
+        elif len(i.properties) > 0:
+            self.outfile.write(
+                "  GValue changed_properties[%d]; /* the values before the change */\n"
+                "  guint num_changed_properties;\n" % (len(i.properties))
+            )
+        if rate_limited:
+            self.outfile.write("  gint64 changed_properties_emit_time;\n")
         self.outfile.write(
-            "  for (n = 0; n < num_params + num_extra; n++)\n"
-            "    g_value_unset (&paramv[n]);\n"
-            "  g_free (paramv);\n"
+            "  GSource *changed_properties_idle_source;\n"
+            "  GMainContext *context;\n"
+            "  GMutex lock;\n"
         )
-        self.outfile.write("}\n" "\n")
+        if method_stats:
+            self.outfile.write("  _MethodStats method_stats[%d];\n" % (len(i.methods)))
+        self.outfile.write("};\n" "\n")
+
+        if method_stats:
+            self.outfile.write(
+                "static void\n"
+                "_%s_skeleton_method_completed (\n"
+                "    %s *object,\n"
+                "    GDBusMethodInvocation *invocation,\n"
+                "    guint method_index)\n"
+                "{\n"
+                "  if (%sIS_%s_SKELETON (object))\n"
+                "    _g_dbus_codegen_method_stats_complete (&%s%s_SKELETON (object)->priv->method_stats[method_index], invocation);\n"
+                "}\n"
+                "\n"
+                % (
+                    i.name_lower,
+                    i.camel_name,
+                    i.ns_upper,
+                    i.name_upper,
+                    i.ns_upper,
+                    i.name_upper,
+                )
+            )
+
+        if self.method_handlers and len(i.methods) > 0:
+            self.generate_skeleton_method_handlers(i)
+        else:
+            self.outfile.write(
+                "static void\n"
+                "_%s_skeleton_handle_method_call (\n"
+                "  GDBusConnection *connection G_GNUC_UNUSED,\n"
+                "  const gchar *sender G_GNUC_UNUSED,\n"
+                "  const gchar *object_path G_GNUC_UNUSED,\n"
+                "  const gchar *interface_name,\n"
+                "  const gchar *method_name,\n"
+                "  GVariant *parameters,\n"
+                "  GDBusMethodInvocation *invocation,\n"
+                "  gpointer user_data)\n"
+                "{\n"
+                "  %sSkeleton *skeleton = %s%s_SKELETON (user_data);\n"
+                "  _ExtendedGDBusMethodInfo *info;\n"
+                "  GVariantIter iter;\n"
+                "  GVariant *child;\n"
+                "  GValue *paramv;\n"
+                "  gsize num_params;\n"
+                "  guint num_extra;\n"
+                "  gsize n;\n"
+                "  guint signal_id;\n"
+                "  GValue return_value = G_VALUE_INIT;\n"
+                % (i.name_lower, i.camel_name, i.ns_upper, i.name_upper)
+            )
+            if method_stats:
+                self.outfile.write("  guint method_index;\n" "  gint64 start_time;\n")
+            self.outfile.write(
+                "  info = (_ExtendedGDBusMethodInfo *) g_dbus_method_invocation_get_method_info (invocation);\n"
+                "  g_assert (info != NULL);\n"
+            )
+            if method_stats:
+                self.outfile.write(
+                    "  for (method_index = 0; _%s_method_info_pointers[method_index] != &info->parent_struct; method_index++);\n"
+                    "  start_time = _g_dbus_codegen_method_stats_begin (&skeleton->priv->method_stats[method_index], invocation);\n"
+                    % (i.name_lower)
+                )
+            self.outfile.write(
+                "  num_params = g_variant_n_children (parameters);\n"
+                "  num_extra = info->pass_fdlist ? 3 : 2;"
+                "  paramv = g_new0 (GValue, num_params + num_extra);\n"
+                "  n = 0;\n"
+                "  g_value_init (&paramv[n], %sTYPE_%s);\n"
+                "  g_value_set_object (&paramv[n++], skeleton);\n"
+                "  g_value_init (&paramv[n], G_TYPE_DBUS_METHOD_INVOCATION);\n"
+                "  g_value_set_object (&paramv[n++], invocation);\n"
+                "  if (info->pass_fdlist)\n"
+                "    {\n"
+                "#ifdef G_OS_UNIX\n"
+                "      g_value_init (&paramv[n], G_TYPE_UNIX_FD_LIST);\n"
+                "      g_value_set_object (&paramv[n++], g_dbus_message_get_unix_fd_list (g_dbus_method_invocation_get_message (invocation)));\n"
+                "#else\n"
+                "      g_assert_not_reached ();\n"
+                "#endif\n"
+                "    }\n" % (i.ns_upper, i.name_upper)
+            )
+            self.outfile.write(
+                "  g_variant_iter_init (&iter, parameters);\n"
+                "  while ((child = g_variant_iter_next_value (&iter)) != NULL)\n"
+                "    {\n"
+                "      _ExtendedGDBusArgInfo *arg_info = (_ExtendedGDBusArgInfo *) info->parent_struct.in_args[n - num_extra];\n"
+                "      if (arg_info->use_gvariant)\n"
+                "        {\n"
+                "          g_value_init (&paramv[n], G_TYPE_VARIANT);\n"
+                "          g_value_set_variant (&paramv[n], child);\n"
+                "          n++;\n"
+                "        }\n"
+                "      else\n"
+                "        g_dbus_gvariant_to_gvalue (child, &paramv[n++]);\n"
+                "      g_variant_unref (child);\n"
+                "    }\n"
+            )
+            self.outfile.write("  signal_id = %s;\n" % (method_signal_id))
+            self.outfile.write(
+                "  g_value_init (&return_value, G_TYPE_BOOLEAN);\n"
+                "  g_signal_emitv (paramv, signal_id, 0, &return_value);\n"
+                "  if (!g_value_get_boolean (&return_value))\n"
+                '    g_dbus_method_invocation_return_error (invocation, G_DBUS_ERROR, G_DBUS_ERROR_UNKNOWN_METHOD, "Method %s is not implemented on interface %s", method_name, interface_name);\n'
+            )
+            if method_stats:
+                self.outfile.write(
+                    "  _g_dbus_codegen_method_stats_end (&skeleton->priv->method_stats[method_index], start_time, g_value_get_boolean (&return_value));\n"
+                )
+            self.outfile.write("  g_value_unset (&return_value);\n")
+            self.outfile.write(
+                "  for (n = 0; n < num_params + num_extra; n++)\n"
+                "    g_value_unset (&paramv[n]);\n"
+                "  g_free (paramv);\n"
+            )
+            self.outfile.write("}\n" "\n")
 
         self.outfile.write(
             "static GVariant *\n"
@@ -3873,7 +4942,7 @@ class CodeGenerator:
         )
         self.outfile.write(
             "  ret = NULL;\n"
-            "  info = (_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, property_name);\n"
+            "  info = %s;\n"
             "  g_assert (info != NULL);\n"
             "  pspec = g_object_class_find_property (G_OBJECT_GET_CLASS (skeleton), info->hyphen_name);\n"
             "  if (pspec == NULL)\n"
@@ -3889,7 +4958,7 @@ class CodeGenerator:
             "    }\n"
             "  return ret;\n"
             "}\n"
-            "\n" % (i.name_lower)
+            "\n" % (property_info)
         )
 
         self.outfile.write(
@@ -3912,7 +4981,7 @@ class CodeGenerator:
         )
         self.outfile.write(
             "  ret = FALSE;\n"
-            "  info = (_ExtendedGDBusPropertyInfo *) g_dbus_interface_info_lookup_property ((GDBusInterfaceInfo *) &_%s_interface_info.parent_struct, property_name);\n"
+            "  info = %s;\n"
             "  g_assert (info != NULL);\n"
             "  pspec = g_object_class_find_property (G_OBJECT_GET_CLASS (skeleton), info->hyphen_name);\n"
             "  if (pspec == NULL)\n"
@@ -3931,7 +5000,7 @@ class CodeGenerator:
             "    }\n"
             "  return ret;\n"
             "}\n"
-            "\n" % (i.name_lower)
+            "\n" % (property_info)
         )
 
         self.outfile.write(
@@ -4119,9 +5188,17 @@ class CodeGenerator:
                 % (len(i.properties))
             )
             self.outfile.write("  g_free (skeleton->priv->properties);\n")
-        self.outfile.write(
-            "  g_list_free_full (skeleton->priv->changed_properties, (GDestroyNotify) _changed_property_free);\n"
-        )
+        if not self.changed_property_array:
+            self.outfile.write(
+                "  g_list_free_full (skeleton->priv->changed_properties, (GDestroyNotify) _changed_property_free);\n"
+            )
+        elif len(i.properties) > 0:
+            self.outfile.write(
+                "  for (n = 0; n < %d; n++)\n"
+                "    if (G_VALUE_TYPE (&skeleton->priv->changed_properties[n]) != G_TYPE_INVALID)\n"
+                "      g_value_unset (&skeleton->priv->changed_properties[n]);\n"
+                % (len(i.properties))
+            )
         self.outfile.write(
             "  if (skeleton->priv->changed_properties_idle_source != NULL)\n"
         )
@@ -4130,6 +5207,11 @@ class CodeGenerator:
         )
         self.outfile.write("  g_main_context_unref (skeleton->priv->context);\n")
         self.outfile.write("  g_mutex_clear (&skeleton->priv->lock);\n")
+        if method_stats:
+            self.outfile.write(
+                "  _g_dbus_codegen_method_stats_clear (skeleton->priv->method_stats, %d);\n"
+                % (len(i.methods))
+            )
         self.outfile.write(
             "  G_OBJECT_CLASS (%s_skeleton_parent_class)->finalize (object);\n"
             "}\n"
@@ -4175,8 +5257,11 @@ class CodeGenerator:
                 "  %sSkeleton *skeleton = %s%s_SKELETON (user_data);\n"
                 % (i.name_lower, i.camel_name, i.ns_upper, i.name_upper)
             )
+            if self.changed_property_array:
+                self.outfile.write("  guint n;\n")
+            else:
+                self.outfile.write("  GList *l;\n")
             self.outfile.write(
-                "  GList *l;\n"
                 "  GVariantBuilder builder;\n"
                 "  GVariantBuilder invalidated_builder;\n"
                 "  guint num_changes;\n"
@@ -4184,21 +5269,49 @@ class CodeGenerator:
                 "  g_mutex_lock (&skeleton->priv->lock);\n"
                 '  g_variant_builder_init (&builder, G_VARIANT_TYPE ("a{sv}"));\n'
                 '  g_variant_builder_init (&invalidated_builder, G_VARIANT_TYPE ("as"));\n'
-                "  for (l = skeleton->priv->changed_properties, num_changes = 0; l != NULL; l = l->next)\n"
-                "    {\n"
-                "      ChangedProperty *cp = l->data;\n"
-                "      GVariant *variant;\n"
-                "      const GValue *cur_value;\n"
-                "\n"
-                "      cur_value = &skeleton->priv->properties[cp->prop_id - 1];\n"
-                "      if (!_g_value_equal (cur_value, &cp->orig_value))\n"
-                "        {\n"
-                "          variant = g_dbus_gvalue_to_gvariant (cur_value, G_VARIANT_TYPE (cp->info->parent_struct.signature));\n"
-                '          g_variant_builder_add (&builder, "{sv}", cp->info->parent_struct.name, variant);\n'
-                "          g_variant_unref (variant);\n"
-                "          num_changes++;\n"
-                "        }\n"
-                "    }\n"
+            )
+            if self.changed_property_array:
+                self.outfile.write(
+                    "  for (n = 0, num_changes = 0; n < %d; n++)\n"
+                    "    {\n"
+                    "      GValue *orig_value = &skeleton->priv->changed_properties[n];\n"
+                    "      const _ExtendedGDBusPropertyInfo *info;\n"
+                    "      GVariant *variant;\n"
+                    "      const GValue *cur_value;\n"
+                    "\n"
+                    "      if (G_VALUE_TYPE (orig_value) == G_TYPE_INVALID)\n"
+                    "        continue;\n"
+                    "      cur_value = &skeleton->priv->properties[n];\n"
+                    "      if (!_g_value_equal (cur_value, orig_value))\n"
+                    "        {\n"
+                    "          info = (const _ExtendedGDBusPropertyInfo *) _%s_property_info_pointers[n];\n"
+                    "          variant = g_dbus_gvalue_to_gvariant (cur_value, G_VARIANT_TYPE (info->parent_struct.signature));\n"
+                    '          g_variant_builder_add (&builder, "{sv}", info->parent_struct.name, variant);\n'
+                    "          g_variant_unref (variant);\n"
+                    "          num_changes++;\n"
+                    "        }\n"
+                    "      g_value_unset (orig_value);\n"
+                    "    }\n" % (len(i.properties), i.name_lower)
+                )
+            else:
+                self.outfile.write(
+                    "  for (l = skeleton->priv->changed_properties, num_changes = 0; l != NULL; l = l->next)\n"
+                    "    {\n"
+                    "      ChangedProperty *cp = l->data;\n"
+                    "      GVariant *variant;\n"
+                    "      const GValue *cur_value;\n"
+                    "\n"
+                    "      cur_value = &skeleton->priv->properties[cp->prop_id - 1];\n"
+                    "      if (!_g_value_equal (cur_value, &cp->orig_value))\n"
+                    "        {\n"
+                    "          variant = g_dbus_gvalue_to_gvariant (cur_value, G_VARIANT_TYPE (cp->info->parent_struct.signature));\n"
+                    '          g_variant_builder_add (&builder, "{sv}", cp->info->parent_struct.name, variant);\n'
+                    "          g_variant_unref (variant);\n"
+                    "          num_changes++;\n"
+                    "        }\n"
+                    "    }\n"
+                )
+            self.outfile.write(
                 "  if (num_changes > 0)\n"
                 "    {\n"
                 "      GList *connections, *ll;\n"
@@ -4219,59 +5332,88 @@ class CodeGenerator:
                 "                                         NULL);\n"
                 "        }\n"
                 "      g_variant_unref (signal_variant);\n"
-                "      g_list_free_full (connections, g_object_unref);\n"
+                "      g_list_free_full (connections, g_object_unref);\n" % (i.name)
+            )
+            if rate_limited:
+                self.outfile.write(
+                    "      skeleton->priv->changed_properties_emit_time = g_get_monotonic_time ();\n"
+                )
+            self.outfile.write(
                 "    }\n"
                 "  else\n"
                 "    {\n"
                 "      g_variant_builder_clear (&builder);\n"
                 "      g_variant_builder_clear (&invalidated_builder);\n"
-                "    }\n" % (i.name)
-            )
-            self.outfile.write(
-                "  g_list_free_full (skeleton->priv->changed_properties, (GDestroyNotify) _changed_property_free);\n"
+                "    }\n"
             )
-            self.outfile.write("  skeleton->priv->changed_properties = NULL;\n")
+            if self.changed_property_array:
+                self.outfile.write("  skeleton->priv->num_changed_properties = 0;\n")
+            else:
+                self.outfile.write(
+                    "  g_list_free_full (skeleton->priv->changed_properties, (GDestroyNotify) _changed_property_free);\n"
+                )
+                self.outfile.write("  skeleton->priv->changed_properties = NULL;\n")
             self.outfile.write(
                 "  skeleton->priv->changed_properties_idle_source = NULL;\n"
             )
             self.outfile.write("  g_mutex_unlock (&skeleton->priv->lock);\n")
             self.outfile.write("  return FALSE;\n" "}\n" "\n")
             # holding lock while being called
-            self.outfile.write(
-                "static void\n"
-                "_%s_schedule_emit_changed (%sSkeleton *skeleton, const _ExtendedGDBusPropertyInfo *info, guint prop_id, const GValue *orig_value)\n"
-                "{\n"
-                "  ChangedProperty *cp;\n"
-                "  GList *l;\n"
-                "  cp = NULL;\n"
-                "  for (l = skeleton->priv->changed_properties; l != NULL; l = l->next)\n"
-                "    {\n"
-                "      ChangedProperty *i_cp = l->data;\n"
-                "      if (i_cp->info == info)\n"
-                "        {\n"
-                "          cp = i_cp;\n"
-                "          break;\n"
-                "        }\n"
-                "    }\n" % (i.name_lower, i.camel_name)
-            )
-            self.outfile.write(
-                "  if (cp == NULL)\n"
-                "    {\n"
-                "      cp = g_new0 (ChangedProperty, 1);\n"
-                "      cp->prop_id = prop_id;\n"
-                "      cp->info = info;\n"
-                "      skeleton->priv->changed_properties = g_list_prepend (skeleton->priv->changed_properties, cp);\n"
-                "      g_value_init (&cp->orig_value, G_VALUE_TYPE (orig_value));\n"
-                "      g_value_copy (orig_value, &cp->orig_value);\n"
-                "    }\n"
-                "}\n"
-                "\n"
-            )
+            if self.changed_property_array:
+                self.outfile.write(
+                    "static void\n"
+                    "_%s_schedule_emit_changed (%sSkeleton *skeleton, const _ExtendedGDBusPropertyInfo *info G_GNUC_UNUSED, guint prop_id, const GValue *orig_value)\n"
+                    "{\n"
+                    "  GValue *changed_value = &skeleton->priv->changed_properties[prop_id - 1];\n"
+                    "  if (G_VALUE_TYPE (changed_value) == G_TYPE_INVALID)\n"
+                    "    {\n"
+                    "      g_value_init (changed_value, G_VALUE_TYPE (orig_value));\n"
+                    "      g_value_copy (orig_value, changed_value);\n"
+                    "      skeleton->priv->num_changed_properties++;\n"
+                    "    }\n"
+                    "}\n"
+                    "\n" % (i.name_lower, i.camel_name)
+                )
+            else:
+                self.outfile.write(
+                    "static void\n"
+                    "_%s_schedule_emit_changed (%sSkeleton *skeleton, const _ExtendedGDBusPropertyInfo *info, guint prop_id, const GValue *orig_value)\n"
+                    "{\n"
+                    "  ChangedProperty *cp;\n"
+                    "  GList *l;\n"
+                    "  cp = NULL;\n"
+                    "  for (l = skeleton->priv->changed_properties; l != NULL; l = l->next)\n"
+                    "    {\n"
+                    "      ChangedProperty *i_cp = l->data;\n"
+                    "      if (i_cp->info == info)\n"
+                    "        {\n"
+                    "          cp = i_cp;\n"
+                    "          break;\n"
+                    "        }\n"
+                    "    }\n" % (i.name_lower, i.camel_name)
+                )
+                self.outfile.write(
+                    "  if (cp == NULL)\n"
+                    "    {\n"
+                    "      cp = g_new0 (ChangedProperty, 1);\n"
+                    "      cp->prop_id = prop_id;\n"
+                    "      cp->info = info;\n"
+                    "      skeleton->priv->changed_properties = g_list_prepend (skeleton->priv->changed_properties, cp);\n"
+                    "      g_value_init (&cp->orig_value, G_VALUE_TYPE (orig_value));\n"
+                    "      g_value_copy (orig_value, &cp->orig_value);\n"
+                    "    }\n"
+                    "}\n"
+                    "\n"
+                )
 
             # Postpone setting up the refresh source until the ::notify signal is emitted as
             # this allows use of g_object_freeze_notify()/g_object_thaw_notify() ...
             # This is useful when updating several properties from another thread than
             # where the idle will be emitted from
+            if self.changed_property_array:
+                have_changes = "skeleton->priv->num_changed_properties > 0"
+            else:
+                have_changes = "skeleton->priv->changed_properties != NULL"
             self.outfile.write(
                 "static void\n"
                 "%s_skeleton_notify (GObject      *object,\n"
@@ -4279,10 +5421,25 @@ class CodeGenerator:
                 "{\n"
                 "  %sSkeleton *skeleton = %s%s_SKELETON (object);\n"
                 "  g_mutex_lock (&skeleton->priv->lock);\n"
-                "  if (skeleton->priv->changed_properties != NULL &&\n"
+                "  if (%s &&\n"
                 "      skeleton->priv->changed_properties_idle_source == NULL)\n"
                 "    {\n"
-                "      skeleton->priv->changed_properties_idle_source = g_idle_source_new ();\n"
+                % (i.name_lower, i.camel_name, i.ns_upper, i.name_upper, have_changes)
+            )
+            if rate_limited:
+                self.outfile.write(
+                    "      gint64 delay = skeleton->priv->changed_properties_emit_time + %d * G_TIME_SPAN_MILLISECOND - g_get_monotonic_time ();\n"
+                    "      if (delay > 0)\n"
+                    "        skeleton->priv->changed_properties_idle_source = g_timeout_source_new ((delay + G_TIME_SPAN_MILLISECOND - 1) / G_TIME_SPAN_MILLISECOND);\n"
+                    "      else\n"
+                    "        skeleton->priv->changed_properties_idle_source = g_idle_source_new ();\n"
+                    % (i.properties_changed_min_interval)
+                )
+            else:
+                self.outfile.write(
+                    "      skeleton->priv->changed_properties_idle_source = g_idle_source_new ();\n"
+                )
+            self.outfile.write(
                 "      g_source_set_priority (skeleton->priv->changed_properties_idle_source, G_PRIORITY_DEFAULT);\n"
                 "      g_source_set_callback (skeleton->priv->changed_properties_idle_source, _%s_emit_changed, g_object_ref (skeleton), (GDestroyNotify) g_object_unref);\n"
                 '      g_source_set_name (skeleton->priv->changed_properties_idle_source, "[generated] _%s_emit_changed");\n'
@@ -4291,15 +5448,7 @@ class CodeGenerator:
                 "    }\n"
                 "  g_mutex_unlock (&skeleton->priv->lock);\n"
                 "}\n"
-                "\n"
-                % (
-                    i.name_lower,
-                    i.camel_name,
-                    i.ns_upper,
-                    i.name_upper,
-                    i.name_lower,
-                    i.name_lower,
-                )
+                "\n" % (i.name_lower, i.name_lower)
             )
 
             self.outfile.write(
@@ -4357,6 +5506,11 @@ class CodeGenerator:
             )
         )
         self.outfile.write("  g_mutex_init (&skeleton->priv->lock);\n")
+        if method_stats:
+            self.outfile.write(
+                "  _g_dbus_codegen_method_stats_init (skeleton->priv->method_stats, %d);\n"
+                % (len(i.methods))
+            )
         self.outfile.write(
             "  skeleton->priv->context = g_main_context_ref_thread_default ();\n"
         )
@@ -4500,6 +5654,90 @@ class CodeGenerator:
             )
         )
 
+        if method_stats:
+            self.outfile.write(
+                self.docbook_gen.expand(
+                    "/**\n"
+                    " * %s_skeleton_get_method_stats:\n"
+                    " * @skeleton: A #%sSkeleton.\n"
+                    " * @method_name: The name of a method of the D-Bus interface #%s.\n"
+                    " * @out_num_calls: (out) (optional): Return location for the number of calls received or %%NULL.\n"
+                    " * @out_num_unhandled: (out) (optional): Return location for the number of calls no signal handler handled or %%NULL.\n"
+                    " * @out_num_completed: (out) (optional): Return location for the number of calls finished with the <literal>complete</literal> function of the method or %%NULL.\n"
+                    " * @out_handle_time: (out) (optional): Return location for the time spent dispatching calls to the signal handlers, in microseconds, or %%NULL.\n"
+                    " * @out_complete_time: (out) (optional): Return location for the time between calls being received and finished with the <literal>complete</literal> function, in microseconds, or %%NULL.\n"
+                    " * @out_max_complete_time: (out) (optional): Return location for the longest of these times, in microseconds, or %%NULL.\n"
+                    " *\n"
+                    " * Gets statistics of the calls of @method_name handled by @skeleton since it was created or %s_skeleton_reset_method_stats() was last called.\n"
+                    " *\n"
+                    " * The statistics of a method are read and updated under a lock, so this function may be called from any thread, and the values it returns are taken at the same instant. Calls finished by returning an error are counted in @out_num_calls only.\n"
+                    " *\n"
+                    " * Returns: %%TRUE if @method_name is a method of the interface, %%FALSE otherwise.\n"
+                    % (i.name_lower, i.camel_name, i.name, i.name_lower),
+                    False,
+                )
+            )
+            self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
+            self.outfile.write(
+                "gboolean\n"
+                "%s_skeleton_get_method_stats (\n"
+                "    %sSkeleton *skeleton,\n"
+                "    const gchar *method_name,\n"
+                "    guint *out_num_calls,\n"
+                "    guint *out_num_unhandled,\n"
+                "    guint *out_num_completed,\n"
+                "    guint64 *out_handle_time,\n"
+                "    guint64 *out_complete_time,\n"
+                "    guint64 *out_max_complete_time)\n"
+                "{\n"
+                "  guint n;\n"
+                "  g_return_val_if_fail (%sIS_%s_SKELETON (skeleton), FALSE);\n"
+                "  g_return_val_if_fail (method_name != NULL, FALSE);\n"
+                "  for (n = 0; n < %d; n++)\n"
+                "    {\n"
+                "      if (g_strcmp0 (_%s_method_info_pointers[n]->name, method_name) == 0)\n"
+                "        {\n"
+                "          _g_dbus_codegen_method_stats_get (&skeleton->priv->method_stats[n],\n"
+                "            out_num_calls, out_num_unhandled, out_num_completed,\n"
+                "            out_handle_time, out_complete_time, out_max_complete_time);\n"
+                "          return TRUE;\n"
+                "        }\n"
+                "    }\n"
+                "  return FALSE;\n"
+                "}\n"
+                "\n"
+                % (
+                    i.name_lower,
+                    i.camel_name,
+                    i.ns_upper,
+                    i.name_upper,
+                    len(i.methods),
+                    i.name_lower,
+                )
+            )
+            self.outfile.write(
+                "/**\n"
+                " * %s_skeleton_reset_method_stats:\n"
+                " * @skeleton: A #%sSkeleton.\n"
+                " *\n"
+                " * Resets the statistics returned by %s_skeleton_get_method_stats() for every method of @skeleton.\n"
+                % (i.name_lower, i.camel_name, i.name_lower)
+            )
+            self.write_gtkdoc_deprecated_and_since_and_close(i, self.outfile, 0)
+            self.outfile.write(
+                "void\n"
+                "%s_skeleton_reset_method_stats (\n"
+                "    %sSkeleton *skeleton)\n"
+                "{\n"
+                "  guint n;\n"
+                "  g_return_if_fail (%sIS_%s_SKELETON (skeleton));\n"
+                "  for (n = 0; n < %d; n++)\n"
+                "    _g_dbus_codegen_method_stats_reset (&skeleton->priv->method_stats[n]);\n"
+                "}\n"
+                "\n"
+                % (i.name_lower, i.camel_name, i.ns_upper, i.name_upper, len(i.methods))
+            )
+
     # ---------------------------------------------------------------------------------------------------
 
     def generate_object(self):
@@ -5448,23 +6686,48 @@ class CodeGenerator:
         )
         self.outfile.write("\n")
 
+    def generate_interface_section(self, i):
+        self.generate_interface_intro(i)
+        self.generate_signals_enum_for_interface(i)
+        self.generate_method_signal_ids_for_interface(i)
+        self.generate_introspection_for_interface(i)
+        self.generate_signal_marshallers(i)
+        self.generate_method_marshallers(i)
+        self.generate_interface(i)
+        self.generate_property_accessors(i)
+        self.generate_signal_emitters(i)
+        self.generate_method_calls(i)
+        self.generate_method_completers(i)
+        self.generate_proxy(i)
+        self.generate_skeleton(i)
+
+    def generate_interface_sections_in_parallel(self):
+        # The per-interface code only reads the generator state (set up by the
+        # generic marshallers), so each section can be rendered separately in a
+        # worker and the results written out in interface order.
+        worker_generator = copy.copy(self)
+        worker_generator.outfile = None
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(self.jobs, len(self.ifaces)),
+            initializer=_init_worker_generator,
+            initargs=(worker_generator,),
+        ) as executor:
+            for section in executor.map(
+                _generate_interface_section_in_worker, range(len(self.ifaces))
+            ):
+                self.outfile.write(section)
+
     def generate(self):
         self.generate_body_preamble()
         for i in self.ifaces:
             self.generate_generic_marshallers(i)
-        for i in self.ifaces:
-            self.generate_interface_intro(i)
-            self.generate_signals_enum_for_interface(i)
-            self.generate_introspection_for_interface(i)
-            self.generate_signal_marshallers(i)
-            self.generate_method_marshallers(i)
-            self.generate_interface(i)
-            self.generate_property_accessors(i)
-            self.generate_signal_emitters(i)
-            self.generate_method_calls(i)
-            self.generate_method_completers(i)
-            self.generate_proxy(i)
-            self.generate_skeleton(i)
+        if self.jobs > 1 and len(self.ifaces) > 1:
+            self.generate_interface_sections_in_parallel()
+        else:
+            for i in self.ifaces:
+                self.generate_interface_section(i)
         if self.generate_objmanager:
             self.generate_object()
             self.generate_object_manager_client()
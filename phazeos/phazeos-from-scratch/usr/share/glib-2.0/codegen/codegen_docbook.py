@@ -19,7 +19,7 @@
 #
 # Author: David Zeuthen <davidz@redhat.com>
 
-import re
+import io
 import textwrap
 from os import path
 
@@ -321,24 +321,7 @@ class DocbookCodeGenerator:
         self.out.write("</refsect2>\n")
 
     def expand(self, s, expandParamsAndConstants):
-        for key in self.expand_member_dict_keys:
-            s = s.replace(key, self.expand_member_dict[key])
-        for key in self.expand_iface_dict_keys:
-            s = s.replace(key, self.expand_iface_dict[key])
-        if expandParamsAndConstants:
-            # replace @foo with <parameter>foo</parameter>
-            s = re.sub(
-                "@[a-zA-Z0-9_]*",
-                lambda m: "<parameter>" + m.group(0)[1:] + "</parameter>",
-                s,
-            )
-            # replace e.g. %TRUE with <constant>TRUE</constant>
-            s = re.sub(
-                "%[a-zA-Z0-9_]*",
-                lambda m: "<constant>" + m.group(0)[1:] + "</constant>",
-                s,
-            )
-        return s
+        return self.sigil_expander.expand(s, expandParamsAndConstants)
 
     def expand_paras(self, s, expandParamsAndConstants):
         s = textwrap.dedent(self.expand(s, expandParamsAndConstants)).rstrip()
@@ -388,18 +371,18 @@ class DocbookCodeGenerator:
                     p.name,
                 )
                 self.expand_member_dict[key] = value
-        # Make sure to expand the keys in reverse order so e.g. #org.foo.Iface:MediaCompat
-        # is evaluated before #org.foo.Iface:Media ...
-        self.expand_member_dict_keys = sorted(
-            self.expand_member_dict.keys(), reverse=True
-        )
-        self.expand_iface_dict_keys = sorted(
-            self.expand_iface_dict.keys(), reverse=True
+        self.sigil_expander = utils.SigilExpander(
+            self.expand_member_dict,
+            self.expand_iface_dict,
+            "<parameter>%s</parameter>",
+            "<constant>%s</constant>",
         )
 
-    def generate(self, docbook, outdir):
+    def generate(self, docbook, outdir, writer=None):
+        if writer is None:
+            writer = utils.OutputWriter()
         for i in self.ifaces:
-            self.out = open(path.join(outdir, "%s-%s.xml" % (docbook, i.name)), "w")
+            self.out = io.StringIO()
             self.out.write("")
             self.out.write('<?xml version="1.0" encoding="utf-8"?>\n')
             self.out.write(
@@ -479,3 +462,6 @@ class DocbookCodeGenerator:
 
             self.out.write("</refentry>\n")
             self.out.write("\n")
+            writer.write(
+                path.join(outdir, "%s-%s.xml" % (docbook, i.name)), self.out.getvalue()
+            )
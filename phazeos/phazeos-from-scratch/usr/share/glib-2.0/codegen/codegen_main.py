@@ -22,92 +22,117 @@
 # Author: David Zeuthen <davidz@redhat.com>
 
 import argparse
+import io
+import json
 import os
+import shlex
 import sys
-from contextlib import contextmanager
+import time
+import traceback
+from contextlib import contextmanager, redirect_stderr
 
 from . import config
 from . import dbustypes
 from . import parser
-from . import codegen
-from . import codegen_docbook
-from . import codegen_md
-from . import codegen_rst
-from .utils import print_error, print_warning
+from .utils import print_error, print_info, print_warning, OutputWriter
 
 
-def find_arg(arg_list, arg_name):
-    for a in arg_list:
-        if a.name == arg_name:
-            return a
-    return None
+def index_by_name(objs):
+    index = {}
+    for o in objs:
+        # Like a linear search, the first object with a given name wins
+        index.setdefault(o.name, o)
+    return index
 
 
-def find_method(iface, method):
-    for m in iface.methods:
-        if m.name == method:
-            return m
-    return None
+class InterfaceIndex:
+    """Looks up interfaces, their members and the arguments of those by name.
 
+    The index of the members of an interface, or of the arguments of a
+    member, is only built the first time it is needed.
+    """
 
-def find_signal(iface, signal):
-    for m in iface.signals:
-        if m.name == signal:
-            return m
-    return None
+    def __init__(self, iface_list):
+        self._ifaces = index_by_name(iface_list)
+        self._children = {}
 
+    def _find_child(self, parent, attrs, name):
+        key = (id(parent), attrs)
+        index = self._children.get(key)
+        if index is None:
+            children = []
+            for attr in attrs:
+                children.extend(getattr(parent, attr))
+            index = self._children[key] = index_by_name(children)
+        return index.get(name)
 
-def find_prop(iface, prop):
-    for m in iface.properties:
-        if m.name == prop:
-            return m
-    return None
+    def find_iface(self, name):
+        return self._ifaces.get(name)
+
+    def find_method(self, iface, name):
+        return self._find_child(iface, ("methods",), name)
+
+    def find_signal(self, iface, name):
+        return self._find_child(iface, ("signals",), name)
+
+    def find_prop(self, iface, name):
+        return self._find_child(iface, ("properties",), name)
+
+    def find_method_arg(self, method, name):
+        return self._find_child(method, ("in_args", "out_args"), name)
+
+    def find_signal_arg(self, signal, name):
+        return self._find_child(signal, ("args",), name)
+
+
+def header_name_for_body(c_file):
+    if c_file == "-":
+        return ""
+    return os.path.splitext(os.path.basename(c_file))[0] + ".h"
 
 
 @contextmanager
-def file_or_stdout(filename):
+def file_or_stdout(filename, writer=None):
+    # Generators write many small fragments; collect them and write the file
+    # in one go once generation succeeded.
+    outfile = io.StringIO()
+    yield outfile
     if filename is None or filename == "-":
-        yield sys.stdout
+        sys.stdout.write(outfile.getvalue())
     else:
-        with open(filename, "w") as outfile:
-            yield outfile
-
+        if writer is None:
+            writer = OutputWriter()
+        writer.write(filename, outfile.getvalue())
 
-def apply_annotation(iface_list, iface, method, signal, prop, arg, key, value):
-    iface_obj = None
-    for i in iface_list:
-        if i.name == iface:
-            iface_obj = i
-            break
 
+def find_annotation_target(index, iface, method, signal, prop, arg):
+    iface_obj = index.find_iface(iface)
     if iface_obj is None:
         print_error('No interface "{}"'.format(iface))
 
     target_obj = None
 
     if method:
-        method_obj = find_method(iface_obj, method)
+        method_obj = index.find_method(iface_obj, method)
         if method_obj is None:
             print_error('No method "{}" on interface "{}"'.format(method, iface))
         if arg:
-            arg_obj = find_arg(method_obj.in_args, arg)
+            arg_obj = index.find_method_arg(method_obj, arg)
             if arg_obj is None:
-                arg_obj = find_arg(method_obj.out_args, arg)
-                if arg_obj is None:
-                    print_error(
-                        'No arg "{}" on method "{}" on interface "{}"'.format(
-                            arg, method, iface
-                        )
+                print_error(
+                    'No arg "{}" on method "{}" on interface "{}"'.format(
+                        arg, method, iface
                     )
+                )
             target_obj = arg_obj
         else:
             target_obj = method_obj
     elif signal:
-        signal_obj = find_signal(iface_obj, signal)
+        signal_obj = index.find_signal(iface_obj, signal)
         if signal_obj is None:
             print_error('No signal "{}" on interface "{}"'.format(signal, iface))
         if arg:
-            arg_obj = find_arg(signal_obj.args, arg)
+            arg_obj = index.find_signal_arg(signal_obj, arg)
             if arg_obj is None:
                 print_error(
                     'No arg "{}" on signal "{}" on interface "{}"'.format(
@@ -118,75 +143,239 @@ def apply_annotation(iface_list, iface, method, signal, prop, arg, key, value):
         else:
             target_obj = signal_obj
     elif prop:
-        prop_obj = find_prop(iface_obj, prop)
+        prop_obj = index.find_prop(iface_obj, prop)
         if prop_obj is None:
             print_error('No property "{}" on interface "{}"'.format(prop, iface))
         target_obj = prop_obj
     else:
         target_obj = iface_obj
-    target_obj.annotations.insert(0, dbustypes.Annotation(key, value))
+    return target_obj
 
 
-def apply_annotations(iface_list, annotation_list):
-    # apply annotations given on the command line
-    for what, key, value in annotation_list:
-        pos = what.find("::")
+def parse_annotation_target(what):
+    """Splits an --annotate WHAT into (iface, method, signal, prop, arg)"""
+    pos = what.find("::")
+    if pos != -1:
+        # signal
+        iface = what[0:pos]
+        signal = what[pos + 2 :]
+        pos = signal.find("[")
+        if pos != -1:
+            arg = signal[pos + 1 :]
+            signal = signal[0:pos]
+            pos = arg.find("]")
+            arg = arg[0:pos]
+            return (iface, None, signal, None, arg)
+        else:
+            return (iface, None, signal, None, None)
+    else:
+        pos = what.find(":")
         if pos != -1:
-            # signal
+            # property
             iface = what[0:pos]
-            signal = what[pos + 2 :]
-            pos = signal.find("[")
-            if pos != -1:
-                arg = signal[pos + 1 :]
-                signal = signal[0:pos]
-                pos = arg.find("]")
-                arg = arg[0:pos]
-                apply_annotation(iface_list, iface, None, signal, None, arg, key, value)
-            else:
-                apply_annotation(
-                    iface_list, iface, None, signal, None, None, key, value
-                )
+            prop = what[pos + 1 :]
+            return (iface, None, None, prop, None)
         else:
-            pos = what.find(":")
+            pos = what.find("()")
             if pos != -1:
-                # property
-                iface = what[0:pos]
-                prop = what[pos + 1 :]
-                apply_annotation(iface_list, iface, None, None, prop, None, key, value)
-            else:
-                pos = what.find("()")
+                # method
+                combined = what[0:pos]
+                pos = combined.rfind(".")
+                iface = combined[0:pos]
+                method = combined[pos + 1 :]
+                pos = what.find("[")
                 if pos != -1:
-                    # method
-                    combined = what[0:pos]
-                    pos = combined.rfind(".")
-                    iface = combined[0:pos]
-                    method = combined[pos + 1 :]
-                    pos = what.find("[")
-                    if pos != -1:
-                        arg = what[pos + 1 :]
-                        pos = arg.find("]")
-                        arg = arg[0:pos]
-                        apply_annotation(
-                            iface_list, iface, method, None, None, arg, key, value
-                        )
-                    else:
-                        apply_annotation(
-                            iface_list, iface, method, None, None, None, key, value
-                        )
+                    arg = what[pos + 1 :]
+                    pos = arg.find("]")
+                    arg = arg[0:pos]
+                    return (iface, method, None, None, arg)
                 else:
-                    # must be an interface
-                    iface = what
-                    apply_annotation(
-                        iface_list, iface, None, None, None, None, key, value
+                    return (iface, method, None, None, None)
+            else:
+                # must be an interface
+                iface = what
+                return (iface, None, None, None, None)
+
+
+def apply_annotations(iface_list, annotation_list):
+    index = InterfaceIndex(iface_list)
+
+    # Annotations given later take precedence, so each one goes in front of
+    # the annotations already on its target. Collect them per target instead
+    # of inserting at the front of the list every time.
+    pending = {}
+    for what, key, value in annotation_list:
+        target_obj = find_annotation_target(index, *parse_annotation_target(what))
+        _, annotations = pending.setdefault(id(target_obj), (target_obj, []))
+        annotations.append(dbustypes.Annotation(key, value))
+
+    for target_obj, annotations in pending.values():
+        target_obj.annotations[:0] = reversed(annotations)
+
+
+def check_unique_member_names(iface_list, kinds):
+    """Stops with an error if an interface has two members of the same name
+    among the given kinds ("method" or "property"), which the lookup tables
+    built at generation time can't tell apart"""
+    for i in iface_list:
+        for kind, members in (("method", i.methods), ("property", i.properties)):
+            if kind not in kinds:
+                continue
+            seen = set()
+            for m in members:
+                if m.name in seen:
+                    print_error(
+                        'Duplicate {} "{}" on interface "{}"'.format(
+                            kind, m.name, i.name
+                        )
                     )
+                seen.add(m.name)
+
 
+def load_annotation_file(filename):
+    """Reads WHAT, KEY, VALUE annotation triples from a file.
 
-def codegen_main():
+    Files ending in .json hold a list of three-element arrays, anything else
+    is read as one tab-separated triple per line. Empty lines and lines
+    starting with # are ignored.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            data = f.read()
+    except OSError as e:
+        print_error('Cannot read annotation file "{}": {}'.format(filename, e.strerror))
+
+    annotations = []
+    if filename.endswith(".json"):
+        try:
+            entries = json.loads(data)
+        except ValueError as e:
+            print_error('Invalid JSON in annotation file "{}": {}'.format(filename, e))
+        if not isinstance(entries, list):
+            print_error(
+                'Annotation file "{}" must contain a list of annotations'.format(
+                    filename
+                )
+            )
+        for n, entry in enumerate(entries):
+            if (
+                not isinstance(entry, list)
+                or len(entry) != 3
+                or not all(isinstance(field, str) for field in entry)
+            ):
+                print_error(
+                    'Annotation {} in "{}" is not a [WHAT, KEY, VALUE] list of '
+                    "strings".format(n, filename)
+                )
+            annotations.append(entry)
+    else:
+        for lineno, line in enumerate(data.splitlines(), 1):
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) != 3:
+                print_error(
+                    "{}:{}: Expected WHAT, KEY and VALUE separated by tabs".format(
+                        filename, lineno
+                    )
+                )
+            annotations.append(fields)
+    return annotations
+
+
+def load_batch_manifest(filename):
+    """Reads the jobs of a --batch manifest.
+
+    Each non-empty line holds the command line arguments of one job, quoted
+    like in a POSIX shell. Text from a # to the end of the line is ignored.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        print_error('Cannot read batch manifest "{}": {}'.format(filename, e.strerror))
+
+    jobs = []
+    for lineno, line in enumerate(lines, 1):
+        try:
+            job = shlex.split(line, comments=True)
+        except ValueError as e:
+            print_error("{}:{}: {}".format(filename, lineno, e))
+        if not job:
+            continue
+        if "--batch" in job:
+            print_error("{}:{}: Batch jobs cannot use --batch".format(filename, lineno))
+        jobs.append(job)
+    return jobs
+
+
+def run_batch_job(job):
+    """Runs one job of a batch, returning its exit status, the time it took
+    and the messages it printed"""
+    messages = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stderr(messages):
+        try:
+            codegen_main(job)
+            status = 0
+        except SystemExit as e:
+            if e.code is None:
+                status = 0
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    return status, time.perf_counter() - start, messages.getvalue()
+
+
+def run_batch(manifest, jobs):
+    batch_jobs = load_batch_manifest(manifest)
+    start = time.perf_counter()
+    n_failed = 0
+
+    def report(n, job, result):
+        status, elapsed, messages = result
+        sys.stderr.write(messages)
+        print_info(
+            "[{}/{}] {} in {:.3f}s: {}".format(
+                n + 1,
+                len(batch_jobs),
+                "done" if status == 0 else "FAILED",
+                elapsed,
+                shlex.join(job),
+            )
+        )
+        return status != 0
+
+    if jobs > 1 and len(batch_jobs) > 1:
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(run_batch_job, batch_jobs)
+            for n, (job, result) in enumerate(zip(batch_jobs, results)):
+                n_failed += report(n, job, result)
+    else:
+        for n, job in enumerate(batch_jobs):
+            n_failed += report(n, job, run_batch_job(job))
+
+    print_info(
+        "{} jobs in {:.3f}s, {} failed".format(
+            len(batch_jobs), time.perf_counter() - start, n_failed
+        )
+    )
+    sys.exit(1 if n_failed else 0)
+
+
+def codegen_main(argv=None):
     arg_parser = argparse.ArgumentParser(
         description="D-Bus code and documentation generator"
     )
     arg_parser.add_argument(
-        "files", metavar="FILE", nargs="+", help="D-Bus introspection XML file"
+        "files", metavar="FILE", nargs="*", help="D-Bus introspection XML file"
     )
     arg_parser.add_argument(
         "--xml-files",
@@ -218,6 +407,43 @@ def codegen_main():
         default="objects",
         help="Generate autocleanup support",
     )
+    arg_parser.add_argument(
+        "--c-generate-fast-dispatch",
+        action="store_true",
+        help="Make generated skeletons look up incoming method calls and "
+        "property accesses in perfect hash tables built at generation time",
+    )
+    arg_parser.add_argument(
+        "--c-generate-method-handlers",
+        action="store_true",
+        help="Make generated skeletons handle each D-Bus method in a function "
+        "of its own, which unpacks the arguments into an array on the stack",
+    )
+    arg_parser.add_argument(
+        "--c-generate-changed-property-array",
+        action="store_true",
+        help="Make generated skeletons record changed properties in an array "
+        "indexed by property instead of a list",
+    )
+    arg_parser.add_argument(
+        "--c-generate-proxy-property-cache",
+        action="store_true",
+        help="Make generated proxies keep the C value of each property, "
+        "so their getters do not look the property up by name. The getters "
+        "must then be called from the thread the proxy receives signals in",
+    )
+    arg_parser.add_argument(
+        "--c-generate-proxy-property-batch",
+        action="store_true",
+        help="Generate functions setting several properties of a proxy at once "
+        "and reading all of them with GetAll (requires GLib 2.36)",
+    )
+    arg_parser.add_argument(
+        "--c-generate-method-stats",
+        action="store_true",
+        help="Make generated skeletons count the calls of each D-Bus method "
+        "and time their handling, and generate functions to query the counts",
+    )
     arg_parser.add_argument(
         "--generate-docbook",
         metavar="OUTFILES",
@@ -245,6 +471,15 @@ def codegen_main():
         metavar="WHAT KEY VALUE",
         help="Add annotation (may be used several times)",
     )
+    arg_parser.add_argument(
+        "--annotate-file",
+        action="append",
+        metavar="FILE",
+        help="Add the annotations listed in FILE, as a JSON list of "
+        "[WHAT, KEY, VALUE] arrays if it ends in .json and as tab-separated "
+        "WHAT KEY VALUE lines otherwise (may be used several times; --annotate "
+        "takes precedence)",
+    )
     arg_parser.add_argument(
         "--glib-min-required",
         metavar="VERSION",
@@ -273,6 +508,37 @@ def codegen_main():
         "--symbol-decorator",
     )
 
+    arg_parser.add_argument(
+        "--jobs",
+        "-j",
+        metavar="N",
+        type=int,
+        default=1,
+        help="Number of processes used to generate C code for the interfaces; "
+        "0 means one per CPU (default: 1)",
+    )
+    arg_parser.add_argument(
+        "--write-if-changed",
+        action="store_true",
+        help="Only rewrite output files whose contents changed, so unchanged "
+        "files keep their modification time",
+    )
+    arg_parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Skip parsing and generation if the inputs and options are unchanged "
+        "since the last run recorded in DIR, and keep the parsed interfaces of "
+        "each input file there for later runs (DIR must be trusted)",
+    )
+
+    arg_parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="Run all the jobs listed in MANIFEST in one process, one job per "
+        "line given as shell-quoted gdbus-codegen arguments; with --jobs, run "
+        "that many jobs in parallel",
+    )
+
     group = arg_parser.add_mutually_exclusive_group()
     group.add_argument(
         "--generate-c-code", metavar="OUTFILES", help="Generate C code in OUTFILES.[ch]"
@@ -290,6 +556,29 @@ def codegen_main():
         help="Generate GDBusInterfaceInfo C code",
     )
 
+    arg_parser.add_argument(
+        "--header-output",
+        metavar="FILE",
+        help="Generate C headers into FILE (may be combined with other outputs)",
+    )
+    arg_parser.add_argument(
+        "--body-output",
+        metavar="FILE",
+        help="Generate C code into FILE (may be combined with other outputs)",
+    )
+    arg_parser.add_argument(
+        "--interface-info-header-output",
+        metavar="FILE",
+        help="Generate GDBusInterfaceInfo C header into FILE "
+        "(may be combined with other outputs)",
+    )
+    arg_parser.add_argument(
+        "--interface-info-body-output",
+        metavar="FILE",
+        help="Generate GDBusInterfaceInfo C code into FILE "
+        "(may be combined with other outputs)",
+    )
+
     group = arg_parser.add_mutually_exclusive_group()
     group.add_argument(
         "--output", metavar="FILE", help="Write output into the specified file"
@@ -301,7 +590,20 @@ def codegen_main():
         help="Location to output generated files",
     )
 
-    args = arg_parser.parse_args()
+    args = arg_parser.parse_args(argv)
+
+    if args.batch is not None:
+        for dest, value in vars(args).items():
+            if dest in ("batch", "jobs") or value in (None, []):
+                continue
+            if value != arg_parser.get_default(dest):
+                print_error("--batch can only be combined with --jobs")
+        if args.jobs < 0:
+            print_error("Invalid --jobs value ‘{}’".format(args.jobs))
+        run_batch(args.batch, args.jobs if args.jobs > 0 else (os.cpu_count() or 1))
+
+    if not args.files:
+        arg_parser.error("the following arguments are required: FILE")
 
     if len(args.xml_files) > 0:
         print_warning(
@@ -319,28 +621,80 @@ def codegen_main():
             "--output at the same time is not allowed"
         )
 
-    if args.generate_c_code:
+    header_file = None
+    body_file = None
+    interface_info_header_file = None
+    interface_info_body_file = None
+
+    multi_output = (
+        args.header_output is not None
+        or args.body_output is not None
+        or args.interface_info_header_output is not None
+        or args.interface_info_body_output is not None
+    )
+
+    if multi_output:
+        if (
+            args.generate_c_code is not None
+            or args.header
+            or args.body
+            or args.interface_info_header
+            or args.interface_info_body
+            or args.output is not None
+        ):
+            print_error(
+                "Using --{header,body,interface-info-header,interface-info-body}-output "
+                "and --generate-c-code, --header, --body, --interface-info-header, "
+                "--interface-info-body or --output at the same time is not allowed"
+            )
+        if args.c_generate_object_manager and (
+            args.interface_info_header_output is not None
+            or args.interface_info_body_output is not None
+        ):
+            print_error(
+                "--c-generate-object-manager is incompatible with "
+                "--interface-info-header-output and --interface-info-body-output"
+            )
+
+        if args.header_output is not None:
+            header_file = args.header_output
+            header_name = os.path.basename(header_file)
+        if args.body_output is not None:
+            body_file = args.body_output
+            if header_file is not None:
+                body_header_name = os.path.basename(header_file)
+            else:
+                body_header_name = header_name_for_body(body_file)
+        if args.interface_info_header_output is not None:
+            interface_info_header_file = args.interface_info_header_output
+            interface_info_header_name = os.path.basename(interface_info_header_file)
+        if args.interface_info_body_output is not None:
+            interface_info_body_file = args.interface_info_body_output
+            if interface_info_header_file is not None:
+                interface_info_body_header_name = os.path.basename(
+                    interface_info_header_file
+                )
+            else:
+                interface_info_body_header_name = header_name_for_body(
+                    interface_info_body_file
+                )
+    elif args.generate_c_code:
         header_name = args.generate_c_code + ".h"
-        h_file = os.path.join(args.output_directory, header_name)
-        args.header = True
-        c_file = os.path.join(args.output_directory, args.generate_c_code + ".c")
-        args.body = True
+        header_file = os.path.join(args.output_directory, header_name)
+        body_file = os.path.join(args.output_directory, args.generate_c_code + ".c")
+        body_header_name = header_name
     elif args.header:
         if args.output is None:
             print_error("Using --header requires --output")
 
-        h_file = args.output
-        header_name = os.path.basename(h_file)
+        header_file = args.output
+        header_name = os.path.basename(header_file)
     elif args.body:
         if args.output is None:
             print_error("Using --body requires --output")
 
-        c_file = args.output
-
-        if c_file == "-":
-            header_name = ""
-        else:
-            header_name = os.path.splitext(os.path.basename(c_file))[0] + ".h"
+        body_file = args.output
+        body_header_name = header_name_for_body(body_file)
     elif args.interface_info_header:
         if args.output is None:
             print_error("Using --interface-info-header requires --output")
@@ -350,8 +704,8 @@ def codegen_main():
                 "--interface-info-header"
             )
 
-        h_file = args.output
-        header_name = os.path.basename(h_file)
+        interface_info_header_file = args.output
+        interface_info_header_name = os.path.basename(interface_info_header_file)
     elif args.interface_info_body:
         if args.output is None:
             print_error("Using --interface-info-body requires --output")
@@ -361,12 +715,19 @@ def codegen_main():
                 "--interface-info-body"
             )
 
-        c_file = args.output
+        interface_info_body_file = args.output
+        interface_info_body_header_name = header_name_for_body(interface_info_body_file)
 
-        if c_file == "-":
-            header_name = ""
-        else:
-            header_name = os.path.splitext(os.path.basename(c_file))[0] + ".h"
+    c_output_files = [
+        f
+        for f in (
+            header_file,
+            body_file,
+            interface_info_header_file,
+            interface_info_body_file,
+        )
+        if f is not None
+    ]
 
     # Check the minimum GLib version. The minimum --glib-min-required is 2.30,
     # because that’s when gdbus-codegen was introduced. Support 1, 2 or 3
@@ -431,40 +792,142 @@ def codegen_main():
             )
         )
 
+    if args.jobs < 0:
+        print_error("Invalid --jobs value ‘{}’".format(args.jobs))
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    input_files = sorted(args.files + args.xml_files)
+
+    # Annotations that come later take precedence, so those given directly on
+    # the command line go after the ones read from files
+    annotations = []
+    for fname in args.annotate_file or []:
+        annotations.extend(load_annotation_file(fname))
+    annotations.extend(args.annotate or [])
+
+    # The outputs on stdout cannot be reproduced without regenerating them
+    build_cache = None
+    if args.cache_dir and "-" not in c_output_files:
+        # Options that do not affect the generated files
+        options = vars(args).copy()
+        del options["cache_dir"]
+        del options["jobs"]
+        del options["write_if_changed"]
+        # Key on the annotations themselves rather than on the files they came from
+        del options["annotate_file"]
+        options["annotate"] = annotations
+        # The documentation files are only known once the input is parsed,
+        # so they are told apart by their prefix
+        outputs = list(c_output_files)
+        for prefix in (args.generate_docbook, args.generate_md, args.generate_rst):
+            if prefix:
+                outputs.append(os.path.join(args.output_directory, prefix))
+        from . import cache
+
+        build_cache = cache.BuildCache(args.cache_dir, input_files, options, outputs)
+        if build_cache.is_up_to_date():
+            sys.exit(0)
+
+    # Annotations given on the command line have to be applied before
+    # post-processing, and may refer to any interface in any file. Without
+    # them, each interface is post-processed as soon as it has been parsed.
+    post_process_while_parsing = not annotations
+
+    # Doc strings only end up in the documentation, not in the C code
+    extract_doc_strings = (
+        args.generate_docbook is not None
+        or args.generate_md is not None
+        or args.generate_rst is not None
+    )
+
+    # Annotations may refer to interfaces in other files, so with them the
+    # interfaces of a file can't be cached on their own
+    iface_cache = None
+    if args.cache_dir and post_process_while_parsing:
+        from . import cache
+
+        iface_cache = cache.InterfaceCache(
+            args.cache_dir,
+            {
+                "interface_prefix": args.interface_prefix,
+                "c_namespace": args.c_namespace,
+                "glib_min_required": glib_min_required,
+                "extract_doc_strings": extract_doc_strings,
+            },
+        )
+
     all_ifaces = []
     input_files_basenames = []
-    for fname in sorted(args.files + args.xml_files):
-        with open(fname, "rb") as f:
-            xml_data = f.read()
-        parsed_ifaces = parser.parse_dbus_xml(
-            xml_data, h_type_implies_unix_fd=(glib_min_required >= (2, 64))
-        )
-        all_ifaces.extend(parsed_ifaces)
+    for fname in input_files:
+        ifaces = None
+        if iface_cache is not None:
+            ifaces = iface_cache.load(fname)
+        if ifaces is None:
+            ifaces = []
+            with open(fname, "rb") as f:
+                for i in parser.iter_parse_dbus_xml(
+                    f,
+                    h_type_implies_unix_fd=(glib_min_required >= (2, 64)),
+                    extract_doc_strings=extract_doc_strings,
+                ):
+                    if post_process_while_parsing:
+                        i.post_process(args.interface_prefix, args.c_namespace)
+                    ifaces.append(i)
+            if iface_cache is not None:
+                iface_cache.store(fname, ifaces)
+        all_ifaces.extend(ifaces)
         input_files_basenames.append(os.path.basename(fname))
 
-    if args.annotate is not None:
-        apply_annotations(all_ifaces, args.annotate)
+    if not post_process_while_parsing:
+        apply_annotations(all_ifaces, annotations)
+        for i in all_ifaces:
+            i.post_process(args.interface_prefix, args.c_namespace)
+
+    if body_file is not None and args.c_generate_fast_dispatch:
+        check_unique_member_names(all_ifaces, ("method", "property"))
+    elif body_file is not None and args.c_generate_proxy_property_cache:
+        check_unique_member_names(all_ifaces, ("property",))
 
-    for i in all_ifaces:
-        i.post_process(args.interface_prefix, args.c_namespace)
+    writer = OutputWriter(args.write_if_changed)
 
+    # The documentation generators build their sigil expansion tables for
+    # all interfaces up front, so only create the ones that are needed. The
+    # C body uses the docbook generator to expand its doc comments.
+    # The generators are only imported when their output is requested, which
+    # keeps the start-up time of the commands that do not need them down.
     docbook = args.generate_docbook
-    docbook_gen = codegen_docbook.DocbookCodeGenerator(all_ifaces)
+    docbook_gen = None
+    if docbook or body_file is not None:
+        from . import codegen_docbook
+
+        docbook_gen = codegen_docbook.DocbookCodeGenerator(all_ifaces)
     if docbook:
-        docbook_gen.generate(docbook, args.output_directory)
+        docbook_gen.generate(docbook, args.output_directory, writer)
 
     md = args.generate_md
-    md_gen = codegen_md.MdCodeGenerator(all_ifaces)
     if md:
-        md_gen.generate(md, args.output_directory)
+        from . import codegen_md
+
+        md_gen = codegen_md.MdCodeGenerator(all_ifaces)
+        md_gen.generate(md, args.output_directory, writer)
 
     rst = args.generate_rst
-    rst_gen = codegen_rst.RstCodeGenerator(all_ifaces)
     if rst:
-        rst_gen.generate(rst, args.output_directory)
+        from . import codegen_rst
+
+        rst_gen = codegen_rst.RstCodeGenerator(all_ifaces)
+        rst_gen.generate(rst, args.output_directory, writer)
+
+    if (
+        header_file is not None
+        or body_file is not None
+        or interface_info_header_file is not None
+        or interface_info_body_file is not None
+    ):
+        from . import codegen
 
-    if args.header:
-        with file_or_stdout(h_file) as outfile:
+    if header_file is not None:
+        with file_or_stdout(header_file, writer) as outfile:
             gen = codegen.HeaderCodeGenerator(
                 all_ifaces,
                 args.c_namespace,
@@ -477,30 +940,39 @@ def codegen_main():
                 args.symbol_decorator,
                 args.symbol_decorator_header,
                 outfile,
+                args.c_generate_proxy_property_batch,
+                args.c_generate_method_stats,
             )
             gen.generate()
 
-    if args.body:
-        with file_or_stdout(c_file) as outfile:
+    if body_file is not None:
+        with file_or_stdout(body_file, writer) as outfile:
             gen = codegen.CodeGenerator(
                 all_ifaces,
                 args.c_namespace,
                 args.c_generate_object_manager,
-                header_name,
+                body_header_name,
                 input_files_basenames,
                 docbook_gen,
                 glib_min_required,
                 args.symbol_decorator_define,
                 outfile,
+                jobs,
+                args.c_generate_fast_dispatch,
+                args.c_generate_method_handlers,
+                args.c_generate_changed_property_array,
+                args.c_generate_proxy_property_cache,
+                args.c_generate_proxy_property_batch,
+                args.c_generate_method_stats,
             )
             gen.generate()
 
-    if args.interface_info_header:
-        with file_or_stdout(h_file) as outfile:
+    if interface_info_header_file is not None:
+        with file_or_stdout(interface_info_header_file, writer) as outfile:
             gen = codegen.InterfaceInfoHeaderCodeGenerator(
                 all_ifaces,
                 args.c_namespace,
-                header_name,
+                interface_info_header_name,
                 input_files_basenames,
                 args.pragma_once,
                 glib_min_required,
@@ -510,12 +982,12 @@ def codegen_main():
             )
             gen.generate()
 
-    if args.interface_info_body:
-        with file_or_stdout(c_file) as outfile:
+    if interface_info_body_file is not None:
+        with file_or_stdout(interface_info_body_file, writer) as outfile:
             gen = codegen.InterfaceInfoBodyCodeGenerator(
                 all_ifaces,
                 args.c_namespace,
-                header_name,
+                interface_info_body_header_name,
                 input_files_basenames,
                 glib_min_required,
                 args.symbol_decorator_define,
@@ -523,6 +995,30 @@ def codegen_main():
             )
             gen.generate()
 
+    if args.write_if_changed:
+        print_info(
+            "{} of {} output files updated".format(
+                writer.n_written, writer.n_written + writer.n_unchanged
+            )
+        )
+
+    if build_cache is not None:
+        output_files = list(c_output_files)
+        for i in all_ifaces:
+            if docbook:
+                output_files.append(
+                    os.path.join(args.output_directory, "%s-%s.xml" % (docbook, i.name))
+                )
+            if md:
+                output_files.append(
+                    os.path.join(args.output_directory, f"{md}-{i.name}.md")
+                )
+            if rst:
+                output_files.append(
+                    os.path.join(args.output_directory, f"{rst}-{i.name}.rst")
+                )
+        build_cache.record(output_files)
+
     sys.exit(0)
 
 
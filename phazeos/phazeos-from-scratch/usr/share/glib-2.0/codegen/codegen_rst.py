@@ -3,7 +3,6 @@
 # SPDX-License-Identifier: LGPL-2.1-or-later
 
 import os
-import re
 
 from . import utils
 import textwrap
@@ -27,24 +26,7 @@ class RstCodeGenerator:
             if line == "":
                 res.append("")
                 continue
-            for key in self._expand_member_dict_keys:
-                line = line.replace(key, self._expand_member_dict[key])
-            for key in self._expand_iface_dict_keys:
-                line = line.replace(key, self._expand_iface_dict[key])
-            if expandParamsAndConstants:
-                # replace @foo with ``foo``
-                line = re.sub(
-                    "@[a-zA-Z0-9_]*",
-                    lambda m: "``" + m.group(0)[1:] + "``",
-                    line,
-                )
-                # replace e.g. %TRUE with ``TRUE``
-                line = re.sub(
-                    "%[a-zA-Z0-9_]*",
-                    lambda m: "``" + m.group(0)[1:] + "``",
-                    line,
-                )
-            res.append(line)
+            res.append(self._sigil_expander.expand(line, expandParamsAndConstants))
         return "\n".join(res)
 
     def _generate_expand_dicts(self):
@@ -71,13 +53,8 @@ class RstCodeGenerator:
                 value = f"`{i.name}:{p.name}`_"
                 self._expand_member_dict[key] = value
 
-        # Make sure to expand the keys in reverse order so e.g. #org.foo.Iface:MediaCompat
-        # is evaluated before #org.foo.Iface:Media ...
-        self._expand_member_dict_keys = sorted(
-            self._expand_member_dict.keys(), reverse=True
-        )
-        self._expand_iface_dict_keys = sorted(
-            self._expand_iface_dict.keys(), reverse=True
+        self._sigil_expander = utils.SigilExpander(
+            self._expand_member_dict, self._expand_iface_dict, "``%s``", "``%s``"
         )
 
     def _generate_header(self, iface):
@@ -331,17 +308,19 @@ class RstCodeGenerator:
             res += [""]
         return "\n".join(res)
 
-    def generate(self, rst, outdir):
+    def generate(self, rst, outdir, writer=None):
         """Generates the reStructuredText file for each interface."""
+        if writer is None:
+            writer = utils.OutputWriter()
         for i in self.ifaces:
-            with open(os.path.join(outdir, f"{rst}-{i.name}.rst"), "w") as outfile:
-                outfile.write(self._generate_header(i))
-                if len(i.properties) > 0:
-                    outfile.write(self._generate_section("Properties", i.name))
-                    outfile.write(self._generate_properties(i))
-                if len(i.methods) > 0:
-                    outfile.write(self._generate_section("Methods", i.name))
-                    outfile.write(self._generate_methods(i))
-                if len(i.signals) > 0:
-                    outfile.write(self._generate_section("Signals", i.name))
-                    outfile.write(self._generate_signals(i))
+            res = [self._generate_header(i)]
+            if len(i.properties) > 0:
+                res.append(self._generate_section("Properties", i.name))
+                res.append(self._generate_properties(i))
+            if len(i.methods) > 0:
+                res.append(self._generate_section("Methods", i.name))
+                res.append(self._generate_methods(i))
+            if len(i.signals) > 0:
+                res.append(self._generate_section("Signals", i.name))
+                res.append(self._generate_signals(i))
+            writer.write(os.path.join(outdir, f"{rst}-{i.name}.rst"), "".join(res))
@@ -19,78 +19,453 @@
 #
 # Author: David Zeuthen <davidz@redhat.com>
 
+import collections
+import functools
+import re
+
 from . import utils
 from .utils import print_error
 
+# See: gvariant-internal.h
+G_VARIANT_MAX_RECURSION_DEPTH = 128
+
+# A parsed D-Bus type: the type code ("s", "a", "(", "{", ...) and, for
+# containers, the tuple of element types
+VariantType = collections.namedtuple("VariantType", ["code", "children"])
+
 
 # See: variant_type_string_scan_internal()
-def variant_type_string_scan(signature: str, depth_limit: int, i=0):
-    beg_char = signature[i]
-    i += 1
-    if beg_char == "(":
-        while signature[i] != ")":
+#
+# Parses the complete type starting at position i of the signature and
+# returns its VariantType together with the position just past it. This walks
+# the signature with an explicit stack rather than recursing, but reports
+# errors exactly like the recursive scanner in GLib does.
+def variant_type_string_parse(signature: str, depth_limit: int, i=0):
+    # Each frame is [container type code, depth limit, parsed children]
+    stack = []
+    while True:
+        beg_char = signature[i]
+        i += 1
+        node = None
+        if beg_char == "(":
+            stack.append([beg_char, depth_limit, []])
+        elif beg_char == "{":
             if depth_limit == 0:
                 raise ValueError(
                     f'Bad signature "{signature}". Too much recursion beginning at {i}.'
                 )
-            i = variant_type_string_scan(signature, depth_limit - 1, i)
-        i += 1
-    elif beg_char == "{":
-        if depth_limit == 0:
-            raise ValueError(
-                f'Bad signature "{signature}". Too much recursion beginning at {i}.'
-            )
-        elif signature[i] not in "bynqihuxtdsog?":
-            raise ValueError(
-                f'Bad signature "{signature}". "{signature[i]}" is not a valid type for dictionary keys at position {i}.'
-            )
-        i += 1
-        i = variant_type_string_scan(signature, depth_limit - 1, i)
-        if signature[i] != "}":
-            raise ValueError(
-                f'Bad signature "{signature}". Dict must end with "}}" at position {i}.'
-            )
-        i += 1
-    elif beg_char == "a":
-        if depth_limit == 0:
+            elif signature[i] not in "bynqihuxtdsog?":
+                raise ValueError(
+                    f'Bad signature "{signature}". "{signature[i]}" is not a valid type for dictionary keys at position {i}.'
+                )
+            stack.append([beg_char, depth_limit, [VariantType(signature[i], ())]])
+            i += 1
+        elif beg_char == "a":
+            if depth_limit == 0:
+                raise ValueError(
+                    f'Bad signature "{signature}". Too much recursion beginning at {i}.'
+                )
+            stack.append([beg_char, depth_limit, []])
+        elif beg_char not in "bynqiuxtdsogvr*?h":
             raise ValueError(
-                f'Bad signature "{signature}". Too much recursion beginning at {i}.'
+                f'Bad signature "{signature}". Unexpected value "{beg_char}" at position {i}.'
             )
-        i = variant_type_string_scan(signature, depth_limit - 1, i)
-    elif beg_char not in "bynqiuxtdsogvr*?h":
-        raise ValueError(
-            f'Bad signature "{signature}". Unexpected value "{beg_char}" at position {i}.'
-        )
-    return i
+        else:
+            node = VariantType(beg_char, ())
+
+        # Hand completed types to their containers until one of them needs
+        # another element type to be parsed
+        while True:
+            if node is not None:
+                if not stack:
+                    return node, i
+                stack[-1][2].append(node)
+                node = None
+            code, frame_depth_limit, children = stack[-1]
+            if code == "(":
+                if signature[i] == ")":
+                    i += 1
+                    stack.pop()
+                    node = VariantType(code, tuple(children))
+                    continue
+                if frame_depth_limit == 0:
+                    raise ValueError(
+                        f'Bad signature "{signature}". Too much recursion beginning at {i}.'
+                    )
+            elif code == "{":
+                if len(children) == 2:
+                    if signature[i] != "}":
+                        raise ValueError(
+                            f'Bad signature "{signature}". Dict must end with "}}" at position {i}.'
+                        )
+                    i += 1
+                    stack.pop()
+                    node = VariantType(code, tuple(children))
+                    continue
+            elif children:
+                stack.pop()
+                node = VariantType(code, tuple(children))
+                continue
+            depth_limit = frame_depth_limit - 1
+            break
 
 
-# variant_check_signature() does not perform a strict validation check and
-# should not be used in security sensitive contexts.
-def variant_check_signature(signature: str):
-    # See: gvariant-internal.h
-    G_VARIANT_MAX_RECURSION_DEPTH = 128
+def variant_type_string_scan(signature: str, depth_limit: int, i=0):
+    return variant_type_string_parse(signature, depth_limit, i)[1]
+
+
+# Signatures like "s" or "a{sv}" are checked for nearly every argument and
+# property, so remember the result for the ones already seen.
+@functools.lru_cache(maxsize=1024)
+def parse_signature(signature: str):
     if len(signature) > 255:
-        print_error("D-Bus maximum signature length of 255 exceeded.")
+        raise ValueError("D-Bus maximum signature length of 255 exceeded.")
     for s in signature:
         if s not in "ybnqiuxthdvasog(){}":
-            print_error(
+            raise ValueError(
                 f'Bad signature "{signature}". "{s}" is not a valid D-Bus type.'
             )
     try:
-        variant_type_string_scan(signature, G_VARIANT_MAX_RECURSION_DEPTH)
+        return variant_type_string_parse(signature, G_VARIANT_MAX_RECURSION_DEPTH)[0]
     except IndexError:
-        print_error(
+        raise ValueError(
             f'Bad signature "{signature}". Error parsing string or brackets not closed.'
         )
+
+
+# variant_check_signature() does not perform a strict validation check and
+# should not be used in security sensitive contexts.
+def variant_check_signature(signature: str):
+    try:
+        return parse_signature(signature)
     except ValueError as e:
         print_error(e.args[0])
 
 
+# The C types and GLib functions used for an argument of a given D-Bus type
+ArgTypeMapping = collections.namedtuple(
+    "ArgTypeMapping",
+    [
+        "ctype_in_g",
+        "ctype_in",
+        "ctype_in_dup",
+        "ctype_in_default_value",
+        "ctype_out",
+        "gtype",
+        "free_func",
+        "format_in",
+        "format_out",
+        "gvariant_get",
+        "gvalue_type",
+        "gvalue_get",
+        "gvalue_set",
+        "gclosure_marshaller",
+        "array_annotation",
+    ],
+)
+
+# Used for every type without an entry in _ARG_TYPE_MAPPINGS, and for any
+# type when the org.gtk.GDBus.C.ForceGVariant annotation is set. The GVariant
+# format strings depend on the signature and are filled in by Arg.post_process().
+_GVARIANT_ARG_TYPE_MAPPING = ArgTypeMapping(
+    ctype_in_g="GVariant *",
+    ctype_in="GVariant *",
+    ctype_in_dup="GVariant *",
+    ctype_in_default_value="NULL",
+    ctype_out="GVariant **",
+    gtype="G_TYPE_VARIANT",
+    free_func="g_variant_unref",
+    format_in=None,
+    format_out=None,
+    gvariant_get="XXX",
+    gvalue_type="variant",
+    gvalue_get="g_marshal_value_peek_variant",
+    gvalue_set="g_value_take_variant",
+    gclosure_marshaller="g_cclosure_marshal_VOID__VARIANT",
+    array_annotation="",
+)
+
+_ARG_TYPE_MAPPINGS = {
+    "b": ArgTypeMapping(
+        ctype_in_g="gboolean ",
+        ctype_in="gboolean ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="FALSE",
+        ctype_out="gboolean *",
+        gtype="G_TYPE_BOOLEAN",
+        free_func=None,
+        format_in="b",
+        format_out="b",
+        gvariant_get="g_variant_get_boolean",
+        gvalue_type="boolean",
+        gvalue_get="g_marshal_value_peek_boolean",
+        gvalue_set="g_value_set_boolean",
+        gclosure_marshaller="g_cclosure_marshal_VOID__BOOLEAN",
+        array_annotation="",
+    ),
+    "y": ArgTypeMapping(
+        ctype_in_g="guchar ",
+        ctype_in="guchar ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="'\\0'",
+        ctype_out="guchar *",
+        gtype="G_TYPE_UCHAR",
+        free_func=None,
+        format_in="y",
+        format_out="y",
+        gvariant_get="g_variant_get_byte",
+        gvalue_type="uchar",
+        gvalue_get="g_marshal_value_peek_uchar",
+        gvalue_set="g_value_set_uchar",
+        gclosure_marshaller="g_cclosure_marshal_VOID__UCHAR",
+        array_annotation="",
+    ),
+    "n": ArgTypeMapping(
+        ctype_in_g="gint ",
+        ctype_in="gint16 ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0",
+        ctype_out="gint16 *",
+        gtype="G_TYPE_INT",
+        free_func=None,
+        format_in="n",
+        format_out="n",
+        gvariant_get="g_variant_get_int16",
+        gvalue_type="int",
+        gvalue_get="g_marshal_value_peek_int",
+        gvalue_set="g_value_set_int",
+        gclosure_marshaller="g_cclosure_marshal_VOID__INT",
+        array_annotation="",
+    ),
+    "q": ArgTypeMapping(
+        ctype_in_g="guint ",
+        ctype_in="guint16 ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0",
+        ctype_out="guint16 *",
+        gtype="G_TYPE_UINT",
+        free_func=None,
+        format_in="q",
+        format_out="q",
+        gvariant_get="g_variant_get_uint16",
+        gvalue_type="uint",
+        gvalue_get="g_marshal_value_peek_uint",
+        gvalue_set="g_value_set_uint",
+        gclosure_marshaller="g_cclosure_marshal_VOID__UINT",
+        array_annotation="",
+    ),
+    "i": ArgTypeMapping(
+        ctype_in_g="gint ",
+        ctype_in="gint ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0",
+        ctype_out="gint *",
+        gtype="G_TYPE_INT",
+        free_func=None,
+        format_in="i",
+        format_out="i",
+        gvariant_get="g_variant_get_int32",
+        gvalue_type="int",
+        gvalue_get="g_marshal_value_peek_int",
+        gvalue_set="g_value_set_int",
+        gclosure_marshaller="g_cclosure_marshal_VOID__INT",
+        array_annotation="",
+    ),
+    "u": ArgTypeMapping(
+        ctype_in_g="guint ",
+        ctype_in="guint ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0",
+        ctype_out="guint *",
+        gtype="G_TYPE_UINT",
+        free_func=None,
+        format_in="u",
+        format_out="u",
+        gvariant_get="g_variant_get_uint32",
+        gvalue_type="uint",
+        gvalue_get="g_marshal_value_peek_uint",
+        gvalue_set="g_value_set_uint",
+        gclosure_marshaller="g_cclosure_marshal_VOID__UINT",
+        array_annotation="",
+    ),
+    "x": ArgTypeMapping(
+        ctype_in_g="gint64 ",
+        ctype_in="gint64 ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0",
+        ctype_out="gint64 *",
+        gtype="G_TYPE_INT64",
+        free_func=None,
+        format_in="x",
+        format_out="x",
+        gvariant_get="g_variant_get_int64",
+        gvalue_type="int64",
+        gvalue_get="g_marshal_value_peek_int64",
+        gvalue_set="g_value_set_int64",
+        gclosure_marshaller=None,
+        array_annotation="",
+    ),
+    "t": ArgTypeMapping(
+        ctype_in_g="guint64 ",
+        ctype_in="guint64 ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0",
+        ctype_out="guint64 *",
+        gtype="G_TYPE_UINT64",
+        free_func=None,
+        format_in="t",
+        format_out="t",
+        gvariant_get="g_variant_get_uint64",
+        gvalue_type="uint64",
+        gvalue_get="g_marshal_value_peek_uint64",
+        gvalue_set="g_value_set_uint64",
+        gclosure_marshaller=None,
+        array_annotation="",
+    ),
+    "d": ArgTypeMapping(
+        ctype_in_g="gdouble ",
+        ctype_in="gdouble ",
+        ctype_in_dup="GVariant *",
+        ctype_in_default_value="0.0",
+        ctype_out="gdouble *",
+        gtype="G_TYPE_DOUBLE",
+        free_func=None,
+        format_in="d",
+        format_out="d",
+        gvariant_get="g_variant_get_double",
+        gvalue_type="double",
+        gvalue_get="g_marshal_value_peek_double",
+        gvalue_set="g_value_set_double",
+        gclosure_marshaller="g_cclosure_marshal_VOID__DOUBLE",
+        array_annotation="",
+    ),
+    "s": ArgTypeMapping(
+        ctype_in_g="const gchar *",
+        ctype_in="const gchar *",
+        ctype_in_dup="gchar *",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar **",
+        gtype="G_TYPE_STRING",
+        free_func="g_free",
+        format_in="s",
+        format_out="s",
+        gvariant_get="g_variant_get_string",
+        gvalue_type="string",
+        gvalue_get="g_marshal_value_peek_string",
+        gvalue_set="g_value_set_string",
+        gclosure_marshaller="g_cclosure_marshal_VOID__STRING",
+        array_annotation="",
+    ),
+    "o": ArgTypeMapping(
+        ctype_in_g="const gchar *",
+        ctype_in="const gchar *",
+        ctype_in_dup="gchar *",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar **",
+        gtype="G_TYPE_STRING",
+        free_func="g_free",
+        format_in="o",
+        format_out="o",
+        gvariant_get="g_variant_get_string",
+        gvalue_type="string",
+        gvalue_get="g_marshal_value_peek_string",
+        gvalue_set="g_value_set_string",
+        gclosure_marshaller="g_cclosure_marshal_VOID__STRING",
+        array_annotation="",
+    ),
+    "g": ArgTypeMapping(
+        ctype_in_g="const gchar *",
+        ctype_in="const gchar *",
+        ctype_in_dup="gchar *",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar **",
+        gtype="G_TYPE_STRING",
+        free_func="g_free",
+        format_in="g",
+        format_out="g",
+        gvariant_get="g_variant_get_string",
+        gvalue_type="string",
+        gvalue_get="g_marshal_value_peek_string",
+        gvalue_set="g_value_set_string",
+        gclosure_marshaller="g_cclosure_marshal_VOID__STRING",
+        array_annotation="",
+    ),
+    "ay": ArgTypeMapping(
+        ctype_in_g="const gchar *",
+        ctype_in="const gchar *",
+        ctype_in_dup="gchar *",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar **",
+        gtype="G_TYPE_STRING",
+        free_func="g_free",
+        format_in="^ay",
+        format_out="^ay",
+        gvariant_get="g_variant_get_bytestring",
+        gvalue_type="string",
+        gvalue_get="g_marshal_value_peek_string",
+        gvalue_set="g_value_set_string",
+        gclosure_marshaller="g_cclosure_marshal_VOID__STRING",
+        array_annotation="",
+    ),
+    "as": ArgTypeMapping(
+        ctype_in_g="const gchar *const *",
+        ctype_in="const gchar *const *",
+        ctype_in_dup="gchar **",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar ***",
+        gtype="G_TYPE_STRV",
+        free_func="g_strfreev",
+        format_in="^as",
+        format_out="^as",
+        gvariant_get="g_variant_get_strv",
+        gvalue_type="boxed",
+        gvalue_get="g_marshal_value_peek_boxed",
+        gvalue_set="g_value_take_boxed",
+        gclosure_marshaller="g_cclosure_marshal_VOID__BOXED",
+        array_annotation="(array zero-terminated=1)",
+    ),
+    "ao": ArgTypeMapping(
+        ctype_in_g="const gchar *const *",
+        ctype_in="const gchar *const *",
+        ctype_in_dup="gchar **",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar ***",
+        gtype="G_TYPE_STRV",
+        free_func="g_strfreev",
+        format_in="^ao",
+        format_out="^ao",
+        gvariant_get="g_variant_get_objv",
+        gvalue_type="boxed",
+        gvalue_get="g_marshal_value_peek_boxed",
+        gvalue_set="g_value_take_boxed",
+        gclosure_marshaller="g_cclosure_marshal_VOID__BOXED",
+        array_annotation="(array zero-terminated=1)",
+    ),
+    "aay": ArgTypeMapping(
+        ctype_in_g="const gchar *const *",
+        ctype_in="const gchar *const *",
+        ctype_in_dup="gchar **",
+        ctype_in_default_value="NULL",
+        ctype_out="gchar ***",
+        gtype="G_TYPE_STRV",
+        free_func="g_strfreev",
+        format_in="^aay",
+        format_out="^aay",
+        gvariant_get="g_variant_get_bytestring_array",
+        gvalue_type="boxed",
+        gvalue_get="g_marshal_value_peek_boxed",
+        gvalue_set="g_value_take_boxed",
+        gclosure_marshaller="g_cclosure_marshal_VOID__BOXED",
+        array_annotation="(array zero-terminated=1)",
+    ),
+}
+
+
 class Annotation:
     def __init__(self, key, value):
         self.key = key
         self.value = value
-        self.annotations = []
+        self.annotations = utils.AnnotationList()
         self.since = ""
 
     def post_process(self, interface_prefix, cns, cns_upper, cns_lower, container):
@@ -120,10 +495,19 @@ class Annotation:
 
 
 class Arg:
+    __slots__ = (
+        "name",
+        "signature",
+        "annotations",
+        "doc_string",
+        "since",
+        "variant_type",
+    ) + ArgTypeMapping._fields
+
     def __init__(self, name, signature):
         self.name = name
         self.signature = signature
-        self.annotations = []
+        self.annotations = utils.AnnotationList()
         self.doc_string = ""
         self.since = ""
 
@@ -135,273 +519,62 @@ class Arg:
 
         if self.name is None:
             self.name = "unnamed_arg%d" % arg_number
-        # default to GVariant
-        self.ctype_in_g = "GVariant *"
-        self.ctype_in = "GVariant *"
-        self.ctype_in_dup = "GVariant *"
-        self.ctype_in_default_value = "NULL"
-        self.ctype_out = "GVariant **"
-        self.gtype = "G_TYPE_VARIANT"
-        self.free_func = "g_variant_unref"
-        self.format_in = "@" + self.signature
-        self.format_out = "@" + self.signature
-        self.gvariant_get = "XXX"
-        self.gvalue_type = "variant"
-        self.gvalue_get = "g_marshal_value_peek_variant"
-        self.gvalue_set = "g_value_take_variant"
-        self.gclosure_marshaller = "g_cclosure_marshal_VOID__VARIANT"
-        self.array_annotation = ""
-        variant_check_signature(self.signature)
+        self.variant_type = variant_check_signature(self.signature)
 
+        mapping = None
         if not utils.lookup_annotation(
             self.annotations, "org.gtk.GDBus.C.ForceGVariant"
         ):
-            if self.signature == "b":
-                self.ctype_in_g = "gboolean "
-                self.ctype_in = "gboolean "
-                self.ctype_in_default_value = "FALSE"
-                self.ctype_out = "gboolean *"
-                self.gtype = "G_TYPE_BOOLEAN"
-                self.free_func = None
-                self.format_in = "b"
-                self.format_out = "b"
-                self.gvariant_get = "g_variant_get_boolean"
-                self.gvalue_type = "boolean"
-                self.gvalue_get = "g_marshal_value_peek_boolean"
-                self.gvalue_set = "g_value_set_boolean"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__BOOLEAN"
-            elif self.signature == "y":
-                self.ctype_in_g = "guchar "
-                self.ctype_in = "guchar "
-                self.ctype_in_default_value = "'\\0'"
-                self.ctype_out = "guchar *"
-                self.gtype = "G_TYPE_UCHAR"
-                self.free_func = None
-                self.format_in = "y"
-                self.format_out = "y"
-                self.gvariant_get = "g_variant_get_byte"
-                self.gvalue_type = "uchar"
-                self.gvalue_get = "g_marshal_value_peek_uchar"
-                self.gvalue_set = "g_value_set_uchar"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__UCHAR"
-            elif self.signature == "n":
-                self.ctype_in_g = "gint "
-                self.ctype_in = "gint16 "
-                self.ctype_in_default_value = "0"
-                self.ctype_out = "gint16 *"
-                self.gtype = "G_TYPE_INT"
-                self.free_func = None
-                self.format_in = "n"
-                self.format_out = "n"
-                self.gvariant_get = "g_variant_get_int16"
-                self.gvalue_type = "int"
-                self.gvalue_get = "g_marshal_value_peek_int"
-                self.gvalue_set = "g_value_set_int"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__INT"
-            elif self.signature == "q":
-                self.ctype_in_g = "guint "
-                self.ctype_in = "guint16 "
-                self.ctype_in_default_value = "0"
-                self.ctype_out = "guint16 *"
-                self.gtype = "G_TYPE_UINT"
-                self.free_func = None
-                self.format_in = "q"
-                self.format_out = "q"
-                self.gvariant_get = "g_variant_get_uint16"
-                self.gvalue_type = "uint"
-                self.gvalue_get = "g_marshal_value_peek_uint"
-                self.gvalue_set = "g_value_set_uint"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__UINT"
-            elif self.signature == "i":
-                self.ctype_in_g = "gint "
-                self.ctype_in = "gint "
-                self.ctype_in_default_value = "0"
-                self.ctype_out = "gint *"
-                self.gtype = "G_TYPE_INT"
-                self.free_func = None
-                self.format_in = "i"
-                self.format_out = "i"
-                self.gvariant_get = "g_variant_get_int32"
-                self.gvalue_type = "int"
-                self.gvalue_get = "g_marshal_value_peek_int"
-                self.gvalue_set = "g_value_set_int"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__INT"
-            elif self.signature == "u":
-                self.ctype_in_g = "guint "
-                self.ctype_in = "guint "
-                self.ctype_in_default_value = "0"
-                self.ctype_out = "guint *"
-                self.gtype = "G_TYPE_UINT"
-                self.free_func = None
-                self.format_in = "u"
-                self.format_out = "u"
-                self.gvariant_get = "g_variant_get_uint32"
-                self.gvalue_type = "uint"
-                self.gvalue_get = "g_marshal_value_peek_uint"
-                self.gvalue_set = "g_value_set_uint"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__UINT"
-            elif self.signature == "x":
-                self.ctype_in_g = "gint64 "
-                self.ctype_in = "gint64 "
-                self.ctype_in_default_value = "0"
-                self.ctype_out = "gint64 *"
-                self.gtype = "G_TYPE_INT64"
-                self.free_func = None
-                self.format_in = "x"
-                self.format_out = "x"
-                self.gvariant_get = "g_variant_get_int64"
-                self.gvalue_type = "int64"
-                self.gvalue_get = "g_marshal_value_peek_int64"
-                self.gvalue_set = "g_value_set_int64"
-                self.gclosure_marshaller = None
-            elif self.signature == "t":
-                self.ctype_in_g = "guint64 "
-                self.ctype_in = "guint64 "
-                self.ctype_out = "guint64 *"
-                self.ctype_in_default_value = "0"
-                self.gtype = "G_TYPE_UINT64"
-                self.free_func = None
-                self.format_in = "t"
-                self.format_out = "t"
-                self.gvariant_get = "g_variant_get_uint64"
-                self.gvalue_type = "uint64"
-                self.gvalue_get = "g_marshal_value_peek_uint64"
-                self.gvalue_set = "g_value_set_uint64"
-                self.gclosure_marshaller = None
-            elif self.signature == "d":
-                self.ctype_in_g = "gdouble "
-                self.ctype_in = "gdouble "
-                self.ctype_in_default_value = "0.0"
-                self.ctype_out = "gdouble *"
-                self.gtype = "G_TYPE_DOUBLE"
-                self.free_func = None
-                self.format_in = "d"
-                self.format_out = "d"
-                self.gvariant_get = "g_variant_get_double"
-                self.gvalue_type = "double"
-                self.gvalue_get = "g_marshal_value_peek_double"
-                self.gvalue_set = "g_value_set_double"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__DOUBLE"
-            elif self.signature == "s":
-                self.ctype_in_g = "const gchar *"
-                self.ctype_in = "const gchar *"
-                self.ctype_in_dup = "gchar *"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_out = "gchar **"
-                self.gtype = "G_TYPE_STRING"
-                self.free_func = "g_free"
-                self.format_in = "s"
-                self.format_out = "s"
-                self.gvariant_get = "g_variant_get_string"
-                self.gvalue_type = "string"
-                self.gvalue_get = "g_marshal_value_peek_string"
-                self.gvalue_set = "g_value_set_string"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__STRING"
-            elif self.signature == "o":
-                self.ctype_in_g = "const gchar *"
-                self.ctype_in = "const gchar *"
-                self.ctype_in_dup = "gchar *"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_out = "gchar **"
-                self.gtype = "G_TYPE_STRING"
-                self.free_func = "g_free"
-                self.format_in = "o"
-                self.format_out = "o"
-                self.gvariant_get = "g_variant_get_string"
-                self.gvalue_type = "string"
-                self.gvalue_get = "g_marshal_value_peek_string"
-                self.gvalue_set = "g_value_set_string"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__STRING"
-            elif self.signature == "g":
-                self.ctype_in_g = "const gchar *"
-                self.ctype_in = "const gchar *"
-                self.ctype_in_dup = "gchar *"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_out = "gchar **"
-                self.gtype = "G_TYPE_STRING"
-                self.free_func = "g_free"
-                self.format_in = "g"
-                self.format_out = "g"
-                self.gvariant_get = "g_variant_get_string"
-                self.gvalue_type = "string"
-                self.gvalue_get = "g_marshal_value_peek_string"
-                self.gvalue_set = "g_value_set_string"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__STRING"
-            elif self.signature == "ay":
-                self.ctype_in_g = "const gchar *"
-                self.ctype_in = "const gchar *"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_in_dup = "gchar *"
-                self.ctype_out = "gchar **"
-                self.gtype = "G_TYPE_STRING"
-                self.free_func = "g_free"
-                self.format_in = "^ay"
-                self.format_out = "^ay"
-                self.gvariant_get = "g_variant_get_bytestring"
-                self.gvalue_type = "string"
-                self.gvalue_get = "g_marshal_value_peek_string"
-                self.gvalue_set = "g_value_set_string"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__STRING"
-            elif self.signature == "as":
-                self.ctype_in_g = "const gchar *const *"
-                self.ctype_in = "const gchar *const *"
-                self.ctype_in_dup = "gchar **"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_out = "gchar ***"
-                self.gtype = "G_TYPE_STRV"
-                self.free_func = "g_strfreev"
-                self.format_in = "^as"
-                self.format_out = "^as"
-                self.gvariant_get = "g_variant_get_strv"
-                self.gvalue_type = "boxed"
-                self.gvalue_get = "g_marshal_value_peek_boxed"
-                self.gvalue_set = "g_value_take_boxed"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__BOXED"
-                self.array_annotation = "(array zero-terminated=1)"
-            elif self.signature == "ao":
-                self.ctype_in_g = "const gchar *const *"
-                self.ctype_in = "const gchar *const *"
-                self.ctype_in_dup = "gchar **"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_out = "gchar ***"
-                self.gtype = "G_TYPE_STRV"
-                self.free_func = "g_strfreev"
-                self.format_in = "^ao"
-                self.format_out = "^ao"
-                self.gvariant_get = "g_variant_get_objv"
-                self.gvalue_type = "boxed"
-                self.gvalue_get = "g_marshal_value_peek_boxed"
-                self.gvalue_set = "g_value_take_boxed"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__BOXED"
-                self.array_annotation = "(array zero-terminated=1)"
-            elif self.signature == "aay":
-                self.ctype_in_g = "const gchar *const *"
-                self.ctype_in = "const gchar *const *"
-                self.ctype_in_dup = "gchar **"
-                self.ctype_in_default_value = "NULL"
-                self.ctype_out = "gchar ***"
-                self.gtype = "G_TYPE_STRV"
-                self.free_func = "g_strfreev"
-                self.format_in = "^aay"
-                self.format_out = "^aay"
-                self.gvariant_get = "g_variant_get_bytestring_array"
-                self.gvalue_type = "boxed"
-                self.gvalue_get = "g_marshal_value_peek_boxed"
-                self.gvalue_set = "g_value_take_boxed"
-                self.gclosure_marshaller = "g_cclosure_marshal_VOID__BOXED"
-                self.array_annotation = "(array zero-terminated=1)"
+            mapping = _ARG_TYPE_MAPPINGS.get(self.signature)
+        if mapping is None:
+            mapping = _GVARIANT_ARG_TYPE_MAPPING._replace(
+                format_in="@" + self.signature, format_out="@" + self.signature
+            )
+        (
+            self.ctype_in_g,
+            self.ctype_in,
+            self.ctype_in_dup,
+            self.ctype_in_default_value,
+            self.ctype_out,
+            self.gtype,
+            self.free_func,
+            self.format_in,
+            self.format_out,
+            self.gvariant_get,
+            self.gvalue_type,
+            self.gvalue_get,
+            self.gvalue_set,
+            self.gclosure_marshaller,
+            self.array_annotation,
+        ) = mapping
 
         for a in self.annotations:
             a.post_process(interface_prefix, cns, cns_upper, cns_lower, self)
 
 
 class Method:
+    __slots__ = (
+        "name",
+        "h_type_implies_unix_fd",
+        "in_args",
+        "out_args",
+        "annotations",
+        "doc_string",
+        "since",
+        "deprecated",
+        "unix_fd",
+        "name_lower",
+        "name_hyphen",
+        "marshaller_ret_arg",
+        "marshaller_in_args",
+    )
+
     def __init__(self, name, h_type_implies_unix_fd=True):
         self.name = name
         self.h_type_implies_unix_fd = h_type_implies_unix_fd
         self.in_args = []
         self.out_args = []
-        self.annotations = []
+        self.annotations = utils.AnnotationList()
         self.doc_string = ""
         self.since = ""
         self.deprecated = False
@@ -474,10 +647,25 @@ class Method:
 
 
 class Signal:
+    __slots__ = (
+        "name",
+        "args",
+        "annotations",
+        "doc_string",
+        "since",
+        "deprecated",
+        "name_lower",
+        "name_upper",
+        "name_hyphen",
+        "upper_id_name",
+        "marshaller_ret_arg",
+        "marshaller_in_args",
+    )
+
     def __init__(self, name):
         self.name = name
         self.args = []
-        self.annotations = []
+        self.annotations = utils.AnnotationList()
         self.doc_string = ""
         self.since = ""
         self.deprecated = False
@@ -527,11 +715,27 @@ class Signal:
 
 
 class Property:
+    __slots__ = (
+        "name",
+        "signature",
+        "access",
+        "annotations",
+        "arg",
+        "readable",
+        "writable",
+        "doc_string",
+        "since",
+        "deprecated",
+        "emits_changed_signal",
+        "name_lower",
+        "name_hyphen",
+    )
+
     def __init__(self, name, signature, access):
         self.name = name
         self.signature = signature
         self.access = access
-        self.annotations = []
+        self.annotations = utils.AnnotationList()
         self.arg = Arg("value", self.signature)
         self.arg.annotations = self.annotations
         self.readable = False
@@ -605,11 +809,12 @@ class Interface:
         self.methods = []
         self.signals = []
         self.properties = []
-        self.annotations = []
+        self.annotations = utils.AnnotationList()
         self.doc_string = ""
         self.doc_string_brief = ""
         self.since = ""
         self.deprecated = False
+        self.properties_changed_min_interval = 0
 
     def post_process(self, interface_prefix, c_namespace):
         if len(self.doc_string) == 0:
@@ -669,6 +874,32 @@ class Interface:
         ):
             self.deprecated = True
 
+        # Minimum time in milliseconds between two PropertiesChanged signals
+        min_interval = utils.lookup_annotation(
+            self.annotations, "org.gtk.GDBus.C.PropertiesChangedMinInterval"
+        )
+        if min_interval is not None:
+            # Only plain decimal digits: int() would also take signs,
+            # whitespace, underscores and non-ASCII digits
+            if not re.fullmatch("[0-9]+", min_interval):
+                print_error(
+                    'Invalid org.gtk.GDBus.C.PropertiesChangedMinInterval "{}" '
+                    "on interface {}, expected a number of milliseconds".format(
+                        min_interval, self.name
+                    )
+                )
+            value = int(min_interval)
+            # The interval ends up as the guint argument of
+            # g_timeout_source_new() in the generated code
+            if not 0 < value <= 0xFFFFFFFF:
+                print_error(
+                    "org.gtk.GDBus.C.PropertiesChangedMinInterval {} on interface {} "
+                    "is out of range, expected 1 to {} milliseconds".format(
+                        value, self.name, 0xFFFFFFFF
+                    )
+                )
+            self.properties_changed_min_interval = value
+
         for m in self.methods:
             m.post_process(interface_prefix, cns, cns_upper, cns_lower, self)
 
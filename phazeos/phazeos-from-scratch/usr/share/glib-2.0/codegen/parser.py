@@ -19,12 +19,38 @@
 #
 # Author: David Zeuthen <davidz@redhat.com>
 
+import os
+import re
 import xml.parsers.expat
-import textwrap
 
 from . import dbustypes
 from .utils import print_error
 
+# The first line of a doc comment, either "symbol: text" or "symbol:"
+_DOC_COMMENT_SYMBOL_RE = re.compile(
+    r"(?:(?P<symbol>.*?): (?P<rest>.*)|(?P<bare_symbol>.*):)\Z", re.DOTALL
+)
+# A parameter line of a doc comment, "@param: text"
+_DOC_COMMENT_PARAM_RE = re.compile(r"@(.*?): (.*)\Z", re.DOTALL)
+
+
+def _dedent_lines(text):
+    """Equivalent to textwrap.dedent(text).split("\\n"), without the regular
+    expressions that dominate its cost on large doc comments"""
+    lines = [line if line.strip(" \t") else "" for line in text.split("\n")]
+    margin = None
+    for line in lines:
+        if line:
+            indent = line[: len(line) - len(line.lstrip(" \t"))]
+            if margin is None:
+                margin = indent
+            elif not indent.startswith(margin):
+                margin = os.path.commonprefix((margin, indent))
+    if margin:
+        n = len(margin)
+        lines = [line[n:] for line in lines]
+    return lines
+
 
 class DBusXMLParser:
     STATE_TOP = "top"
@@ -37,7 +63,7 @@ class DBusXMLParser:
     STATE_ANNOTATION = "annotation"
     STATE_IGNORED = "ignored"
 
-    def __init__(self, xml_data, h_type_implies_unix_fd=True):
+    def __init__(self, xml_data, h_type_implies_unix_fd=True, extract_doc_strings=True):
         self._parser = xml.parsers.expat.ParserCreate()
         self._parser.CommentHandler = self.handle_comment
         self._parser.CharacterDataHandler = self.handle_char_data
@@ -45,6 +71,7 @@ class DBusXMLParser:
         self._parser.EndElementHandler = self.handle_end_element
 
         self.parsed_interfaces = []
+        self._completed_interfaces = []
         self._cur_object = None
 
         self.state = DBusXMLParser.STATE_TOP
@@ -55,73 +82,82 @@ class DBusXMLParser:
         self.doc_comment_last_symbol = ""
 
         self._h_type_implies_unix_fd = h_type_implies_unix_fd
+        # Doc strings are only needed for documentation; the C code only uses
+        # the @since parameter of doc comments
+        self._extract_doc_strings = extract_doc_strings
 
-        self._parser.Parse(xml_data)
+        # xml_data may be None to feed the data incrementally with feed(), or a
+        # file object to read it in chunks
+        if xml_data is None:
+            pass
+        elif hasattr(xml_data, "read"):
+            self._parser.ParseFile(xml_data)
+        else:
+            self._parser.Parse(xml_data)
+
+    def feed(self, data, is_final=False):
+        self._parser.Parse(data, is_final)
 
-    COMMENT_STATE_BEGIN = "begin"
-    COMMENT_STATE_PARAMS = "params"
-    COMMENT_STATE_BODY = "body"
-    COMMENT_STATE_SKIP = "skip"
+    def pop_completed_interfaces(self):
+        """Returns the interfaces whose closing tag was seen since the last call"""
+        completed = self._completed_interfaces
+        self._completed_interfaces = []
+        return completed
 
     def handle_comment(self, data):
-        comment_state = DBusXMLParser.COMMENT_STATE_BEGIN
-        lines = textwrap.dedent(data).split("\n")
-        symbol = ""
-        body = ""
-        in_para = False
+        lines = _dedent_lines(data)
+        n_lines = len(lines)
+
+        # The first non-empty line names the documented symbol, e.g.
+        # "org.project.Iface:" or "Method: Brief description"
+        idx = 0
+        while idx < n_lines and not lines[idx]:
+            idx += 1
+        if idx == n_lines:
+            return
+        m = _DOC_COMMENT_SYMBOL_RE.match(lines[idx])
+        if m is None:
+            return
+        symbol, rest_of_line = m.group("symbol", "rest")
+        if symbol is None:
+            symbol = m.group("bare_symbol")
+        if symbol == "":
+            return
+        idx += 1
+
+        # Followed by "@param: docs" lines
         params = {}
-        for line in lines:
-            if comment_state == DBusXMLParser.COMMENT_STATE_BEGIN:
-                if len(line) > 0:
-                    colon_index = line.find(": ")
-                    if colon_index == -1:
-                        if line.endswith(":"):
-                            symbol = line[0 : len(line) - 1]
-                            comment_state = DBusXMLParser.COMMENT_STATE_PARAMS
-                        else:
-                            comment_state = DBusXMLParser.COMMENT_STATE_SKIP
-                    else:
-                        symbol = line[0:colon_index]
-                        rest_of_line = line[colon_index + 2 :].strip()
-                        if len(rest_of_line) > 0:
-                            body += f"{rest_of_line}\n"
-                        comment_state = DBusXMLParser.COMMENT_STATE_PARAMS
-            elif comment_state == DBusXMLParser.COMMENT_STATE_PARAMS:
-                if line.startswith("@"):
-                    colon_index = line.find(": ")
-                    if colon_index == -1:
-                        comment_state = DBusXMLParser.COMMENT_STATE_BODY
-                        if not in_para:
-                            body += "\n"
-                            in_para = True
-                        body += f"{line}\n"
-                    else:
-                        param = line[1:colon_index]
-                        docs = line[colon_index + 2 :]
-                        params[param] = docs
-                else:
-                    comment_state = DBusXMLParser.COMMENT_STATE_BODY
-                    if len(line) > 0:
-                        if not in_para:
-                            body += "\n"
-                            in_para = True
-                        body += line + "\n"
-            elif comment_state == DBusXMLParser.COMMENT_STATE_BODY:
-                if len(line) > 0:
-                    if not in_para:
-                        in_para = True
-                    body += line + "\n"
-                else:
-                    if in_para:
-                        body += "\n"
-                        in_para = False
-        if in_para:
-            body += "\n"
+        while idx < n_lines:
+            m = _DOC_COMMENT_PARAM_RE.match(lines[idx])
+            if m is None:
+                break
+            params[m.group(1)] = m.group(2)
+            idx += 1
 
-        if symbol != "":
-            self.doc_comment_last_symbol = symbol
-            self.doc_comment_params = params
-            self.doc_comment_body = body
+        # And then the body, made of paragraphs separated by empty lines
+        body = []
+        if self._extract_doc_strings:
+            if rest_of_line:
+                rest_of_line = rest_of_line.strip()
+                if rest_of_line:
+                    body.append(rest_of_line + "\n")
+            in_para = False
+            if idx < n_lines and lines[idx]:
+                body.append("\n" + lines[idx] + "\n")
+                in_para = True
+            for line in lines[idx + 1 :]:
+                if line:
+                    body.append(line + "\n")
+                    in_para = True
+                elif in_para:
+                    body.append("\n")
+                    in_para = False
+            if in_para:
+                body.append("\n")
+
+        self.doc_comment_last_symbol = symbol
+        self.doc_comment_params = params
+        self.doc_comment_body = "".join(body)
 
     def handle_char_data(self, data):
         # print 'char_data=%s'%data
@@ -292,10 +328,26 @@ class DBusXMLParser:
         self._cur_object_stack.append(old_cur_object)
 
     def handle_end_element(self, name):
+        if self.state == DBusXMLParser.STATE_INTERFACE:
+            self._completed_interfaces.append(self._cur_object)
         self.state = self.state_stack.pop()
         self._cur_object = self._cur_object_stack.pop()
 
 
-def parse_dbus_xml(xml_data, h_type_implies_unix_fd):
-    parser = DBusXMLParser(xml_data, h_type_implies_unix_fd)
+def parse_dbus_xml(xml_data, h_type_implies_unix_fd, extract_doc_strings=True):
+    parser = DBusXMLParser(xml_data, h_type_implies_unix_fd, extract_doc_strings)
     return parser.parsed_interfaces
+
+
+def iter_parse_dbus_xml(
+    f, h_type_implies_unix_fd, extract_doc_strings=True, chunk_size=64 * 1024
+):
+    """Parses XML from a binary file object in chunks, yielding each interface
+    as soon as its closing tag has been seen"""
+    parser = DBusXMLParser(None, h_type_implies_unix_fd, extract_doc_strings)
+    while True:
+        data = f.read(chunk_size)
+        parser.feed(data, is_final=not data)
+        yield from parser.pop_completed_interfaces()
+        if not data:
+            break
@@ -0,0 +1,100 @@
+# -*- Mode: Python -*-
+
+# GDBus - GLib D-Bus Library
+#
+# SPDX-License-Identifier: LGPL-2.1-or-later
+
+"""Compares the name-mangling helpers with their original implementations.
+
+Run from the directory containing the codegen package with
+"python3 -m unittest codegen.test_utils".
+"""
+
+import random
+import unittest
+
+from . import utils
+
+
+# The implementations these helpers had before they were rewritten around
+# regular expressions and memoized. The generated code depends on every
+# name being mangled exactly the same way.
+def old_strip_dots(s):
+    ret = ""
+    force_upper = False
+    for c in s:
+        if c == ".":
+            force_upper = True
+        else:
+            if force_upper:
+                ret += c.upper()
+                force_upper = False
+            else:
+                ret += c
+    return ret
+
+
+def old_camel_case_to_uscore(s):
+    ret = ""
+    insert_uscore = False
+    prev_was_lower = False
+    initial = True
+    for c in s:
+        # Keep initial underscores in camel case
+        if initial and c == "_":
+            ret += "_"
+            continue
+        initial = False
+
+        if c.isupper():
+            if prev_was_lower:
+                insert_uscore = True
+            prev_was_lower = False
+        else:
+            prev_was_lower = True
+        if insert_uscore:
+            ret += "_"
+        ret += c.lower()
+        insert_uscore = False
+    return ret
+
+
+def old_uscore_to_camel_case(s):
+    return "".join([s[0].upper() + s[1:].lower() if s else "_" for s in s.split("_")])
+
+
+class TestNameMangling(unittest.TestCase):
+    N_NAMES = 200000
+
+    # Mostly the characters D-Bus names are made of, plus some that change
+    # length or depend on context when their case is changed
+    D_BUS_CHARS = "aAbBxXyYzZ09_."
+    OTHER_CHARS = "-$ \nßΣσςİıǅéÉ"
+
+    def random_names(self):
+        rand = random.Random(4242)
+        for _ in range(self.N_NAMES):
+            chars = self.D_BUS_CHARS
+            if rand.random() < 0.3:
+                chars += self.OTHER_CHARS
+            yield "".join(rand.choice(chars) for _ in range(rand.randint(0, 12)))
+
+    def check(self, new, old):
+        for name in self.random_names():
+            expected = old(name)
+            self.assertEqual(new(name), expected, repr(name))
+            # And once more, as the result may now come from the cache
+            self.assertEqual(new(name), expected, repr(name))
+
+    def test_strip_dots(self):
+        self.check(utils.strip_dots, old_strip_dots)
+
+    def test_camel_case_to_uscore(self):
+        self.check(utils.camel_case_to_uscore, old_camel_case_to_uscore)
+
+    def test_uscore_to_camel_case(self):
+        self.check(utils.uscore_to_camel_case, old_uscore_to_camel_case)
+
+
+if __name__ == "__main__":
+    unittest.main()
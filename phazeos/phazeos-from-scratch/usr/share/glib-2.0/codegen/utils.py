@@ -19,8 +19,9 @@
 #
 # Author: David Zeuthen <davidz@redhat.com>
 
-import packaging.version
+import functools
 import os
+import re
 import sys
 
 
@@ -37,7 +38,7 @@ class Color:
 
 def print_color(msg, color=Color.END, prefix="MESSAGE"):
     """Print a string with a color prefix"""
-    if os.isatty(sys.stderr.fileno()):
+    if sys.stderr.isatty():
         real_prefix = "{start}{prefix}{end}".format(
             start=color, prefix=prefix, end=Color.END
         )
@@ -70,50 +71,109 @@ def print_info(msg):
     print_color(msg, color=Color.GREEN, prefix="INFO")
 
 
+def write_file_atomically(filename, data):
+    """Write a string or bytes to a file through a temporary file and a
+    rename, so the file is never left half-written.
+
+    Like writing to the file in place, this writes through symlinks and
+    keeps the permissions of an existing file.
+    """
+    import stat
+    import tempfile
+
+    # Replace the file a symlink points to rather than the symlink itself
+    filename = os.path.realpath(filename)
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError:
+        # A new file gets the mode open() would give it
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(filename),
+        prefix=".{}.".format(os.path.basename(filename)),
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        # mkstemp() creates the file as 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def file_has_contents(filename, data):
+    """Check whether a file exists and already contains the given string"""
+    try:
+        with open(filename, "r") as f:
+            return f.read() == data
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+class OutputWriter:
+    """Writes generated files, optionally leaving alone those whose contents
+    did not change so that their mtime is preserved"""
+
+    def __init__(self, only_if_changed=False):
+        self.only_if_changed = only_if_changed
+        self.n_written = 0
+        self.n_unchanged = 0
+
+    def write(self, filename, data):
+        if self.only_if_changed and file_has_contents(filename, data):
+            self.n_unchanged += 1
+            return False
+        write_file_atomically(filename, data)
+        self.n_written += 1
+        return True
+
+
+_DOTS_RE = re.compile(r"\.+(.?)", re.DOTALL)
+_CAMEL_CASE_BOUNDARY_RE = re.compile(r"(?<=[^A-Z])(?=[A-Z])")
+
+
+@functools.lru_cache(maxsize=4096)
 def strip_dots(s):
-    ret = ""
-    force_upper = False
-    for c in s:
-        if c == ".":
-            force_upper = True
-        else:
-            if force_upper:
-                ret += c.upper()
-                force_upper = False
-            else:
-                ret += c
-    return ret
+    # Drop the dots and upper-case the character following each run of them
+    return _DOTS_RE.sub(lambda m: m.group(1).upper(), s)
 
 
 def dots_to_hyphens(s):
     return s.replace(".", "-")
 
 
+@functools.lru_cache(maxsize=4096)
 def camel_case_to_uscore(s):
-    ret = ""
-    insert_uscore = False
-    prev_was_lower = False
-    initial = True
-    for c in s:
-        # Keep initial underscores in camel case
-        if initial and c == "_":
-            ret += "_"
-            continue
-        initial = False
+    # Keep initial underscores in camel case
+    rest = s.lstrip("_")
+    prefix = s[: len(s) - len(rest)]
+
+    if rest.isascii():
+        return prefix + _CAMEL_CASE_BOUNDARY_RE.sub("_", rest).lower()
 
+    # str.isupper() and str.lower() are Unicode-aware in ways a regular
+    # expression can't express (and lower() is context-sensitive for whole
+    # strings), so handle non-ASCII names one character at a time
+    ret = [prefix]
+    prev_was_lower = False
+    for c in rest:
         if c.isupper():
             if prev_was_lower:
-                insert_uscore = True
+                ret.append("_")
             prev_was_lower = False
         else:
             prev_was_lower = True
-        if insert_uscore:
-            ret += "_"
-        ret += c.lower()
-        insert_uscore = False
-    return ret
+        ret.append(c.lower())
+    return "".join(ret)
 
 
+@functools.lru_cache(maxsize=4096)
 def uscore_to_camel_case(s):
     return "".join([s[0].upper() + s[1:].lower() if s else "_" for s in s.split("_")])
 
@@ -124,8 +184,245 @@ def is_ugly_case(s):
     return False
 
 
+def _build_trie(keys):
+    trie = {}
+    for key in keys:
+        node = trie
+        for c in key:
+            node = node.setdefault(c, {})
+        node[None] = key
+    return trie
+
+
+def _trie_to_regex(node):
+    # Trying the children in descending order and the end of a key last
+    # visits the keys in reverse sorted order, so at any position the regex
+    # matches the same key as the first one in that order that fits there
+    alternatives = [
+        re.escape(c) + _trie_to_regex(node[c])
+        for c in sorted((c for c in node if c is not None), reverse=True)
+    ]
+    if None in node:
+        alternatives.append("")
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:%s)" % "|".join(alternatives)
+
+
+def _trie_walk_hits(trie, s, start):
+    """Check whether a key occurs in s at start, or starts there and runs
+    past the end of s"""
+    node = trie
+    for c in s[start:]:
+        node = node.get(c)
+        if node is None:
+            return False
+        if None in node:
+            return True
+    return node is not trie
+
+
+class KeyReplacer:
+    """Replaces all occurrences of a set of keys in a single pass.
+
+    The result is the same as calling str.replace() for each key in reverse
+    sorted order, which makes e.g. #org.foo.Iface:MediaCompat win over
+    #org.foo.Iface:Media. The keys are compiled into one regular expression
+    shaped like a trie. That only gives the same result as the sequence of
+    replacements when the occurrences of keys don't overlap and no key can
+    appear inside or across the boundaries of a replacement, so where that
+    can happen the replacements are still done one key at a time.
+    """
+
+    def __init__(self, replacements):
+        self._replacements = replacements
+        self._keys = sorted(replacements, reverse=True)
+        trie = _build_trie(self._keys)
+        self._regex = re.compile(_trie_to_regex(trie)) if trie else None
+
+        self._keys_can_overlap = False
+        inner_chars = set()
+        for key in self._keys:
+            inner_chars.update(key[1:])
+            for i in range(1, len(key)):
+                if _trie_walk_hits(trie, key, i):
+                    self._keys_can_overlap = True
+                    break
+
+        self._single_pass = "" not in replacements
+        for value in replacements.values():
+            if not value or value[0] in inner_chars:
+                self._single_pass = False
+                break
+            if any(_trie_walk_hits(trie, value, i) for i in range(len(value))):
+                self._single_pass = False
+                break
+
+    def _has_overlapping_keys(self, s, matches):
+        for m in matches:
+            for i in range(m.start() + 1, m.end()):
+                if self._regex.match(s, i):
+                    return True
+        return False
+
+    def _replace_match(self, m):
+        return self._replacements[m.group(0)]
+
+    def replace(self, s):
+        if self._regex is None:
+            return s
+        if self._single_pass:
+            if not self._keys_can_overlap:
+                return self._regex.sub(self._replace_match, s)
+            matches = list(self._regex.finditer(s))
+            if not matches:
+                return s
+            if not self._has_overlapping_keys(s, matches):
+                return self._regex.sub(self._replace_match, s)
+        elif not self._regex.search(s):
+            return s
+        for key in self._keys:
+            s = s.replace(key, self._replacements[key])
+        return s
+
+
+_PARAM_OR_CONSTANT_RE = re.compile("([@%])([a-zA-Z0-9_]*)")
+
+
+class SigilExpander:
+    """Expands gtk-doc sigils in documentation.
+
+    References to members (org.foo.Iface.Method(), #org.foo.Iface::signal and
+    #org.foo.Iface:property) are expanded first, then references to
+    interfaces (#org.foo.Iface). Optionally, @parameter and %CONSTANT are
+    then formatted with the given format strings.
+    """
+
+    def __init__(self, member_links, iface_links, param_format, constant_format):
+        self._member_replacer = KeyReplacer(member_links)
+        self._iface_replacer = KeyReplacer(iface_links)
+        self._formats = {"@": param_format, "%": constant_format}
+
+    def expand(self, s, expand_params_and_constants):
+        s = self._member_replacer.replace(s)
+        s = self._iface_replacer.replace(s)
+        if expand_params_and_constants:
+            s = _PARAM_OR_CONSTANT_RE.sub(
+                lambda m: self._formats[m.group(1)] % m.group(2), s
+            )
+        return s
+
+
+# FNV-1a with the upper half folded into the lower one, as the slot of a name
+# is taken from the low bits. This is what the _g_dbus_codegen_name_hash()
+# function in the generated C code computes.
+_NAME_HASH_BASIS = 2166136261
+NAME_HASH_PRIME = 16777619
+
+
+def name_hash(name, seed=_NAME_HASH_BASIS):
+    """Returns the 32-bit hash of a name, starting from seed"""
+    h = seed
+    for c in name.encode("utf-8"):
+        h = ((h ^ c) * NAME_HASH_PRIME) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+
+def build_perfect_hash(names):
+    """Returns a seed and a table of slots such that each name is the only one
+    whose name_hash() with that seed, modulo the number of slots, is its slot.
+
+    A slot holds the index of its name in names, or -1 if it is unused. The
+    number of slots is a power of two, so the slot of a name can be computed
+    with a mask.
+
+    Raises ValueError if the names are not unique, or if no table is found
+    within a bounded number of attempts.
+    """
+    if len(set(names)) != len(names):
+        raise ValueError("Cannot build a perfect hash of names which are not unique")
+    n_slots = 1
+    while n_slots < len(names):
+        n_slots *= 2
+    # Unique names practically always fit after a doubling or two, the bound
+    # only keeps a pathological input from making the search go on forever
+    for _ in range(8):
+        for seed in range(_NAME_HASH_BASIS, _NAME_HASH_BASIS + 256):
+            slots = [-1] * n_slots
+            for n, name in enumerate(names):
+                slot = name_hash(name, seed) & (n_slots - 1)
+                if slots[slot] != -1:
+                    break
+                slots[slot] = n
+            else:
+                return seed, slots
+        n_slots *= 2
+    raise ValueError("Cannot build a perfect hash of the names")
+
+
+class AnnotationList(list):
+    """A list of annotations which can look up annotations by key without
+    scanning the whole list.
+
+    For longer lists, a key to annotation mapping is built the first time it
+    is needed and dropped whenever the list is modified, so annotations can
+    still be added at any time, e.g. from the command line.
+    """
+
+    __slots__ = ("_index",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._index = None
+
+    def lookup(self, key):
+        """Returns the value of the first annotation with the given key"""
+        index = self._index
+        if index is None:
+            index = {}
+            for a in self:
+                index.setdefault(a.key, a)
+            self._index = index
+        a = index.get(key)
+        if a is None:
+            return None
+        return a.value
+
+
+def _drop_index_and_call(name):
+    list_method = getattr(list, name)
+
+    @functools.wraps(list_method)
+    def method(self, *args, **kwargs):
+        self._index = None
+        return list_method(self, *args, **kwargs)
+
+    return method
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(AnnotationList, _name, _drop_index_and_call(_name))
+del _name
+
+
 def lookup_annotation(annotations, key):
     if annotations:
+        # Scanning a short list is cheaper than building and using the mapping
+        if len(annotations) > 4 and isinstance(annotations, AnnotationList):
+            return annotations.lookup(key)
         for a in annotations:
             if a.key == key:
                 return a.value
@@ -157,6 +454,9 @@ def lookup_brief_docs(annotations):
 
 
 def version_cmp_key(key):
+    # packaging is slow to import and only needed for the C header
+    import packaging.version
+
     # If the 'since' version is 'UNRELEASED', compare higher than anything else
     # If it is empty put a 0 in its place as this will
     # allow LooseVersion to work and will always compare lower.